@@ -1,16 +1,22 @@
 import random
 import typing
-import uuid
 from enum import Enum
-from queue import Queue
+from collections import deque
 from typing import List
 
 import attr
 
 from base_gui.app_logging import LOGGER
-from base_gui.constants import SimConsts
+from base_gui.mac.simconsts import SimConsts
+from base_gui.mac.arrivalindex import ArrivalIntervalIndex
 from base_gui.mac.macstate import MacState
 from base_gui.mac.message import Message, ImmutableMessage, MessageType
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.noderandomstream import NodeRandomStream
+from base_gui.mac.queuedroppolicy import QueueDropPolicy
+
+# Pool used by actors that are not handed one, keeps packet ids unique across such actors
+DEFAULT_MESSAGE_POOL = MessagePool()
 
 
 class CarrierSenseState(Enum):
@@ -35,26 +41,52 @@ class FrozenActorState(object):
 
     transmission_times: list
     num_messages: int
+    # Arrivals lost to a full queue, apart from the retry-limit drops in num_dropped_messages
+    num_queue_drops: int = 0
 
 
 class ActorState(object):
+    """
+    Single-threaded MAC state of one node. Slots and plain deques keep the per-node footprint small enough to hold
+    tens of thousands of actors in one process (see tools/actorstate_budget.py).
+    """
+    __slots__ = ('identifier', 'time', 'time_index', 'state_duration_time', 'state', 'neighbour_states',
+                 'neighbour_distances', 'arrival_index', 'queued_messages', 'in_transit_messages', 'position',
+                 'max_transmission_range', 'data_packet_length', 'jamming_packet_length', 'time_step', 'max_attempts',
+                 'wait_time', 'num_successful_transmissions', 'num_transmission_attempts', 'num_collisions',
+                 'num_dropped_messages', 'num_messages', 'transmission_times', 'drop_message', 'message_pool', 'rng',
+                 'transit_listener', 'queue_limit', 'queue_drop_policy', 'num_queue_drops')
+
     def __init__(self, identifier, time, position,
                  transmission_range=SimConsts.TRANSMISSION_RANGE,
                  data_packet_length=SimConsts.PACKET_LENGTH_SPACE,
                  jamming_packet_length=SimConsts.JAMMING_LENGTH_SPACE,
                  time_step=SimConsts.TIME_STEP,
-                 max_attempts=SimConsts.MAX_ATTEMPTS):
+                 max_attempts=SimConsts.MAX_ATTEMPTS,
+                 message_pool: MessagePool = None,
+                 rng: NodeRandomStream = None,
+                 queue_limit: int = None,
+                 queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP):
 
         self.identifier = identifier
         self.time = time
+        self.time_index = 0
 
         # Time until a delaying state ends, 0 if not transmitting/waiting, also 0 if receiving
         self.state_duration_time = 0
         self.state = MacState.IDLE
         # Flattened way to decide colliding messages
         self.neighbour_states: List[ActorState] = list()
-        self.queued_messages: Queue[Message] = Queue()
-        self.in_transit_messages: Queue[Message] = Queue()
+        # Distance to each entry of neighbour_states, looked up by carrier sense instead of recomputed
+        self.neighbour_distances: List[float] = list()
+        # Busy intervals of all neighbour messages streaming into this actor, filled in by the transmitting neighbours
+        self.arrival_index = ArrivalIntervalIndex()
+        self.queued_messages: typing.Deque[Message] = deque()
+        self.in_transit_messages: typing.Deque[Message] = deque()
+        # Maximum number of queued messages when a new message arrives, unbounded if None
+        assert queue_limit is None or queue_limit > 0
+        self.queue_limit = queue_limit
+        self.queue_drop_policy = queue_drop_policy
 
         self.position = position
 
@@ -71,23 +103,50 @@ class ActorState(object):
         self.num_transmission_attempts = 0
         self.num_collisions = 0
         self.num_dropped_messages = 0
+        self.num_queue_drops = 0
         self.num_messages = 0
 
         self.transmission_times = list()
 
         self.drop_message = False
 
-    def add_neighbour_state(self, state: 'ActorState'):
-        if state not in self.neighbour_states:
-            self.neighbour_states.append(state)
+        self.message_pool = message_pool if message_pool is not None else DEFAULT_MESSAGE_POOL
+        # Backoff draws, the shared module-level generator unless the node has its own seeded stream
+        self.rng = rng if rng is not None else random
+        # Optional callback with every message put on the antenna (cut_off False) or cut off (cut_off True), used to
+        # mirror this actor in other processes
+        self.transit_listener: typing.Optional[typing.Callable[[Message, bool], None]] = None
+
+    def add_neighbour_state(self, state: 'ActorState', distance: float):
+        """
+        Add a neighbour at 'distance', the entry of its link in the NeighbourTable row of this node.
+        The lists grow in place, unless messages on the antenna may still be cut off along them (see
+        set_neighbour_states).
+        """
+        if state in self.neighbour_states:
+            return
+        if len(self.in_transit_messages) > 0:
+            self.neighbour_states = list(self.neighbour_states)
+            self.neighbour_distances = list(self.neighbour_distances)
+        self.neighbour_states.append(state)
+        self.neighbour_distances.append(distance)
+
+    def set_neighbour_states(self, states: List['ActorState'], distances: List[float]):
+        """
+        Replace the neighbour list at once, the caller guarantees the states are unique.
+        The lists are replaced rather than updated in place, messages in the air keep referring to the old ones.
+        """
+        assert len(states) == len(distances)
+        self.neighbour_states = states
+        self.neighbour_distances = distances
 
     def get_frozen_state(self) -> FrozenActorState:
         frozen_queue_items: List[ImmutableMessage] = list()
         frozen_transit_items: List[ImmutableMessage] = list()
         frozen_neighbour_items: List[ImmutableMessage] = list()
-        for queued_message in self.queued_messages.queue:
+        for queued_message in self.queued_messages:
             frozen_queue_items.append(queued_message.get_immutable_message())
-        for in_transit_message in self.in_transit_messages.queue:
+        for in_transit_message in self.in_transit_messages:
             frozen_transit_items.append(in_transit_message.get_immutable_message())
         for neighbour_message in self.get_neighbour_messages_carriersense():
             frozen_neighbour_items.append(neighbour_message.get_immutable_message())
@@ -102,7 +161,8 @@ class ActorState(object):
             num_successful_transmissions=self.num_successful_transmissions,
             num_transmission_attempts=self.num_transmission_attempts,
             num_messages=self.num_messages,
-            transmission_times=self.transmission_times
+            transmission_times=self.transmission_times,
+            num_queue_drops=self.num_queue_drops
         )
 
     def can_transmit(self, message: Message) -> CarrierSenseState:
@@ -116,11 +176,11 @@ class ActorState(object):
         #   -- implement protocol check HERE --
 
         # Internal transmission check
-        if self.queued_messages.qsize() > 0:
+        if len(self.queued_messages) > 0:
             return CarrierSenseState.QUEUED
-        elif self.in_transit_messages.qsize() > 0:
+        elif len(self.in_transit_messages) > 0:
             # for message in list(self.in_transit_messages):
-            last_message = self.in_transit_messages.queue[-1]
+            last_message = self.in_transit_messages[-1]
             if last_message.check_message_transmitting():
                 return CarrierSenseState.TRANSMITTING
 
@@ -133,27 +193,51 @@ class ActorState(object):
 
     def get_neighbour_messages_carriersense(self):
         arriving_messages: List[Message] = list()
-        for neighbour in self.neighbour_states:
-            for message in neighbour.in_transit_messages.queue:
+        for neighbour, distance in zip(self.neighbour_states, self.neighbour_distances):
+            for message in neighbour.in_transit_messages:
                 # It would be illegal to find neighbour messages except for the ones 'arriving'
-                if message.check_message_arriving(self.position):
+                if message.check_message_arriving_distance(distance):
                     arriving_messages.append(message)
         return arriving_messages
 
     def any_neighbour_message_arriving(self):
         """
         Nice method to check whether neighbouring actors have messages which are already streaming into our position.
+        Looks up the arrival interval index instead of scanning the in-transit messages of every neighbour.
         """
-        # TODO DO BETTER, very expensive (hashmap)
-        for neighbour in self.neighbour_states:
-            for message in neighbour.in_transit_messages.queue:
-                # It would be illegal to find neighbour messages except for the ones 'arriving'
-                if message.check_message_arriving(self.position):
-                    return True
-        return False
+        return self.arrival_index.is_busy(self.time_index)
+
+    def put_in_transit(self, message: Message):
+        """
+        Place a message on the antenna and register its arrival interval at every neighbour.
+        """
+        message.emission_index = self.time_index
+        message.emission_neighbours = self.neighbour_states
+        message.emission_distances = self.neighbour_distances
+        self.in_transit_messages.append(message)
+        for neighbour, distance in zip(self.neighbour_states, self.neighbour_distances):
+            neighbour.arrival_index.add_interval(*message.arrival_interval(distance, self.time_step))
+        if self.transit_listener is not None:
+            self.transit_listener(message, False)
+
+    def cut_off_in_transit(self, message: Message):
+        """
+        Cut off the message on the antenna and shorten its arrival interval at every neighbour accordingly.
+        The receivers are the neighbours at the time it was put on the antenna, which differ if nodes moved since.
+        """
+        old_intervals = [message.arrival_interval(distance, self.time_step) for distance in message.emission_distances]
+        message.cut_off_message()
+        for neighbour, distance, (start, old_end) in zip(message.emission_neighbours, message.emission_distances,
+                                                         old_intervals):
+            if start < old_end:
+                _, new_end = message.arrival_interval(distance, self.time_step)
+                neighbour.arrival_index.move_interval_end(old_end, max(new_end, start))
+        if self.transit_listener is not None:
+            self.transit_listener(message, True)
 
     def progress_actorstate_time(self, new_message: bool) -> typing.Any:
 
+        self.arrival_index.advance(self.time_index)
         if new_message:
             self.new_arrival()
             self.num_messages += 1
@@ -161,31 +245,31 @@ class ActorState(object):
         # mac protocol FSM
         next_state = self.state
         if self.state == MacState.IDLE:
-            if self.queued_messages.qsize() > 0:
+            if len(self.queued_messages) > 0:
                 next_state = MacState.READY_TO_TRANSMIT
 
         elif self.state == MacState.READY_TO_TRANSMIT:
             if not self.any_neighbour_message_arriving():
-                self.in_transit_messages.put(self.queued_messages.get())
+                self.put_in_transit(self.queued_messages.popleft())
                 self.num_transmission_attempts += 1
                 next_state = MacState.TRANSMITTING
 
         elif self.state == MacState.TRANSMITTING:
-            current_message = self.in_transit_messages.queue[-1]
+            current_message = self.in_transit_messages[-1]
             if not current_message.check_message_transmitting():  # check if the message that is being transmitted has left the antenna
                 self.num_successful_transmissions += 1
 
                 transmission_time = self.time - current_message.original_start_time
                 self.transmission_times.append(transmission_time)
 
-                if self.queued_messages.qsize() > 0:
+                if len(self.queued_messages) > 0:
                     next_state = MacState.READY_TO_TRANSMIT
                 else:
                     next_state = MacState.IDLE
 
             elif self.any_neighbour_message_arriving():  # Collision detected
                 self.num_collisions += 1
-                current_message.cut_off_message()
+                self.cut_off_in_transit(current_message)
                 if current_message.attempt_count > self.max_attempts:  # retransmission attempt limit
                     self.drop_message = True
                 else:
@@ -196,19 +280,19 @@ class ActorState(object):
                 next_state = MacState.JAMMING
 
         elif self.state == MacState.JAMMING:
-            current_message = self.in_transit_messages.queue[-1]
+            current_message = self.in_transit_messages[-1]
             if not current_message.check_message_transmitting():  # check if the message that is being transmitted has left the antenna
 
                 if self.drop_message:
                     self.num_dropped_messages += 1
                     self.drop_message = False
-                    if self.queued_messages.qsize() > 0:
+                    if len(self.queued_messages) > 0:
                         next_state = MacState.READY_TO_TRANSMIT
                     else:
                         next_state = MacState.IDLE
                 else:
 
-                    self.wait_time = self.random_exponential_backoff(self.queued_messages.queue[0])
+                    self.wait_time = self.random_exponential_backoff(self.queued_messages[0])
                     next_state = MacState.WAIT
 
         elif self.state == MacState.WAIT:
@@ -218,12 +302,41 @@ class ActorState(object):
 
         self.state = next_state
         self.time += self.time_step
+        self.time_index += 1
+
+    def skip_to(self, time_index: int):
+        """
+        Fast-forward over time indices in which nothing happens to this actor: no messages in transit and no FSM
+        transition, only a running backoff timer.
+        """
+        gap = time_index - self.time_index
+        if gap <= 0:
+            return
+        assert len(self.in_transit_messages) == 0
+        if self.state == MacState.WAIT:
+            self.wait_time -= gap
+            assert self.wait_time > 0
+        self.time += gap * self.time_step
+        self.time_index = time_index
+
+    def next_event_index(self) -> typing.Optional[int]:
+        """
+        Next time index at which this actor has to be stepped on its own account, None if it only reacts to new
+        arrivals and neighbour messages. Steps with waves in the air are always taken, as they change the history.
+        """
+        if len(self.in_transit_messages) > 0 or self.arrival_index.busy_count > 0:
+            return self.time_index
+        if self.state in (MacState.READY_TO_TRANSMIT, MacState.TRANSMITTING, MacState.JAMMING):
+            return self.time_index
+        if self.state == MacState.WAIT:
+            return self.time_index + self.wait_time - 1
+        return None
 
     def check_message_transmitting(self):
         transmitting = 0
 
         # Provide sanity check
-        for message in self.in_transit_messages.queue:
+        for message in self.in_transit_messages:
             if message.check_message_transmitting():
                 transmitting += 1
         assert transmitting <= 1  # Otherwise illegal state
@@ -234,50 +347,54 @@ class ActorState(object):
             LOGGER.debug("Deleted message at time {} with prop. distance {} [m].".format(self.time,
                                                                                          message.get_distance_travelled()))
 
-            self.in_transit_messages.queue.remove(message)
+            self.in_transit_messages.remove(message)
+            self.message_pool.release(message)
 
     def new_arrival(self):
-        msg = Message(
+        if self.queue_limit is not None and len(self.queued_messages) >= self.queue_limit:
+            self.num_queue_drops += 1
+            if self.queue_drop_policy is QueueDropPolicy.TAIL_DROP:
+                return
+            self.message_pool.release(self.queued_messages.popleft())
+
+        msg = self.message_pool.acquire(
             type=MessageType.DATA,
             prop_packet_length=self.data_packet_length,
             origin=self.position,
-            packet_id=uuid.uuid4(),
             max_range=self.max_transmission_range,
             retransmission_parent=0,
             attempt_count=1,
             original_start_time=self.time
         )
-        self.queued_messages.put(msg)
+        self.queued_messages.append(msg)
 
     def jamming_message(self):
         # place jamming message on the antenna
 
-        msg = Message(
+        msg = self.message_pool.acquire(
             type=MessageType.JAMMING,
             prop_packet_length=self.jamming_packet_length,
             origin=self.position,
-            packet_id=uuid.uuid4(),
             max_range=self.max_transmission_range,
             retransmission_parent=0,
             attempt_count=1,
             original_start_time=self.time
 
         )
-        self.in_transit_messages.put(msg)
+        self.put_in_transit(msg)
 
     def queue_retransmission(self, message):
 
-        msg = Message(
+        msg = self.message_pool.acquire(
             type=MessageType.RETRANSMISSION,
             prop_packet_length=self.data_packet_length,
             origin=self.position,
-            packet_id=uuid.uuid4(),
             max_range=self.max_transmission_range,
             retransmission_parent=message.packet_id,
             attempt_count=message.attempt_count + 1,
             original_start_time=message.original_start_time
         )
-        self.queued_messages.queue.appendleft(msg)
+        self.queued_messages.appendleft(msg)
 
     def random_exponential_backoff(self, message) -> int:
         min_wait_time = 1
@@ -287,7 +404,7 @@ class ActorState(object):
         else:
             max_wait_time = 255
 
-        wait_time = random.randint(min_wait_time, max_wait_time)
+        wait_time = self.rng.randint(min_wait_time, max_wait_time)
 
         return wait_time
 
@@ -295,7 +412,7 @@ class ActorState(object):
         # propagate messages
 
         outofrange_messages = list()
-        for message in self.in_transit_messages.queue:
+        for message in self.in_transit_messages:
             if message.propagate(self.time_step):
                 outofrange_messages.append(message)
 
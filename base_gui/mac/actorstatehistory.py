@@ -2,7 +2,9 @@ from typing import List
 
 import numpy as np
 
-from base_gui.mac.actorstate import ActorState, FrozenActorState
+from base_gui.mac.actorstate import ActorState
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.noderandomstream import NodeRandomStream
 
 
 class ActorStateHistory(object):
@@ -10,24 +12,24 @@ class ActorStateHistory(object):
             self,
             identifier: str,
             position: np.ndarray,
-            state=None):
+            state=None,
+            message_pool: MessagePool = None,
+            rng: NodeRandomStream = None):
 
         self.identifier = identifier
         self.position: np.ndarray = position
 
         if state is None:
-            self.state: ActorState = ActorState(identifier, 0.0, self.position)
+            self.state: ActorState = ActorState(identifier, 0.0, self.position, message_pool=message_pool, rng=rng)
         else:
             self.state = state
-        self.history: List[FrozenActorState] = list()
 
-    def add_neighbour(self, neighbour_state: ActorState):
-        self.state.add_neighbour_state(neighbour_state)
+    def add_neighbour(self, neighbour_state: ActorState, distance: float):
+        self.state.add_neighbour_state(neighbour_state, distance)
         pass
 
-    def save_state_to_history(self):
-        frozen_state: FrozenActorState = self.state.get_frozen_state()
-        self.history.append(frozen_state)
+    def set_neighbours(self, neighbour_states: List[ActorState], neighbour_distances: List[float]):
+        self.state.set_neighbour_states(neighbour_states, neighbour_distances)
 
     def progress_time(self, new_message):
         self.state.progress_actorstate_time(new_message)
@@ -0,0 +1,58 @@
+from typing import Dict, Callable, Optional
+
+
+class ArrivalIntervalIndex(object):
+    """
+    Busy timeline of a single receiver.
+    Every neighbour message streaming into the receiver is a [start, end) interval of time indices, known as soon as the
+    message is put on the antenna. Intervals are kept as a sparse difference map and folded into a running count while
+    the receiver advances, so a carrier sense query is O(1) regardless of neighbour count and queue depth.
+    """
+    __slots__ = ('time_index', 'busy_count', 'deltas', 'delta_listener')
+
+    def __init__(self):
+        self.time_index = -1
+        self.busy_count = 0
+        self.deltas: Dict[int, int] = dict()
+        # Optional callback with the time index of every new interval boundary (used by the event calendar)
+        self.delta_listener: Optional[Callable[[int], None]] = None
+
+    def __add_delta(self, time_index: int, delta: int):
+        assert time_index > self.time_index  # The past of a receiver can not be changed
+        if self.delta_listener is not None:
+            self.delta_listener(time_index)
+        count = self.deltas.get(time_index, 0) + delta
+        if count == 0:
+            self.deltas.pop(time_index, None)
+        else:
+            self.deltas[time_index] = count
+
+    def add_interval(self, start: int, end: int):
+        if start >= end:
+            return
+        self.__add_delta(start, 1)
+        self.__add_delta(end, -1)
+
+    def move_interval_end(self, old_end: int, new_end: int):
+        """
+        Shorten (or extend) an interval that was added before, used when a message is cut off.
+        """
+        if old_end == new_end:
+            return
+        self.__add_delta(old_end, 1)
+        self.__add_delta(new_end, -1)
+
+    def advance(self, time_index: int):
+        if time_index - self.time_index > len(self.deltas):
+            # Long jump (event-driven mode): only visit the boundaries that are passed
+            for boundary in sorted(boundary for boundary in self.deltas if boundary <= time_index):
+                self.busy_count += self.deltas.pop(boundary)
+            self.time_index = max(self.time_index, time_index)
+            return
+        while self.time_index < time_index:
+            self.time_index += 1
+            self.busy_count += self.deltas.pop(self.time_index, 0)
+
+    def is_busy(self, time_index: int) -> bool:
+        self.advance(time_index)
+        return self.busy_count > 0
@@ -0,0 +1,220 @@
+import itertools
+from abc import abstractmethod, ABC
+from typing import Iterator, Tuple, List, Union, TextIO
+
+import numpy as np
+
+
+class ArrivalSource(ABC):
+    """
+    Arrivals of new messages, handed out as chunks of (start, end, arrival time indices, arrival nodes).
+    Sources can be pickled while they are iterated and iterated again from the time index that was reached
+    ('start_index'), which is how a checkpointed run resumes its arrivals. The first chunk may start before it.
+    """
+    num_nodes: int
+    time_steps: int
+
+    @abstractmethod
+    def iter_chunks(self, start_index: int = 0) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+        pass
+
+    def iter_steps(self, start_index: int = 0) -> Iterator[np.ndarray]:
+        """
+        Arrivals per time index as a boolean vector over the nodes, for engines that visit every time step.
+        """
+        for start, end, times, nodes in self.iter_chunks(start_index):
+            step_bounds = np.searchsorted(times, np.arange(start, end + 1))
+            for time_index in range(max(start, start_index), end):
+                new_messages = np.zeros(self.num_nodes, dtype=bool)
+                new_messages[nodes[step_bounds[time_index - start]:step_bounds[time_index - start + 1]]] = True
+                yield new_messages
+
+
+class ArrivalSubset(ArrivalSource):
+    """
+    Arrivals of 'source' that fall on 'nodes' (ascending), renumbered 0..len(nodes)-1 in that order, for example
+    those of a group of connected components simulated apart. The chunks of 'source' are filtered as they are
+    handed out, so the subset is never held in memory as a whole. Iterating consumes 'source'.
+    """
+
+    def __init__(self, source: ArrivalSource, nodes: np.ndarray):
+        self.source = source
+        self.num_nodes = len(nodes)
+        self.time_steps = source.time_steps
+        self.local_index = np.full(source.num_nodes, -1, dtype=np.int64)
+        self.local_index[nodes] = np.arange(len(nodes))
+
+    def iter_chunks(self, start_index: int = 0) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+        for start, end, times, nodes in self.source.iter_chunks(start_index):
+            local_nodes = self.local_index[nodes]
+            kept = local_nodes >= 0
+            yield start, end, times[kept], local_nodes[kept]
+
+
+class ArrivalSchedule(ArrivalSource):
+    """
+    Sparse Bernoulli arrival process: every node gets a new message in a time step with 'transmission_chance'.
+    Instead of a dense (time_steps, num_nodes) matrix, each node keeps the index of its next arrival and advances it
+    by geometric inter-arrival gaps. Arrivals are handed out in chunks of 'chunk_steps' time steps, so memory scales
+    with the number of arrivals in a chunk instead of with the time horizon.
+    Gaps are drawn from 'generator', the module-level numpy generator if None.
+    """
+
+    def __init__(self, num_nodes: int, time_steps: int, transmission_chance: float, chunk_steps: int = 1024,
+                 generator: np.random.Generator = None):
+        assert 0.0 <= transmission_chance <= 1.0
+        assert chunk_steps > 0
+        self.num_nodes = num_nodes
+        self.time_steps = time_steps
+        self.transmission_chance = transmission_chance
+        self.chunk_steps = chunk_steps
+        self.generator = generator
+
+        self.chunk_start = 0
+        # Chunk handed out last, kept until the next one so a pickled schedule resumes within it
+        self.current_chunk: Tuple[int, int, np.ndarray, np.ndarray] = None
+        if transmission_chance > 0.0:
+            self.next_arrival = self.__draw_gaps(num_nodes) - 1
+        else:
+            self.next_arrival = np.full(num_nodes, time_steps, dtype=np.int64)
+
+    def __draw_gaps(self, count: int) -> np.ndarray:
+        generator = self.generator if self.generator is not None else np.random
+        return generator.geometric(self.transmission_chance, count).astype(np.int64)
+
+    def next_chunk(self) -> Tuple[int, int, np.ndarray, np.ndarray]:
+        """
+        Generate the arrivals of the next chunk [start, end) of time indices.
+        Returns start, end and the time index and node of every arrival, sorted by time index and then node.
+        """
+        start = self.chunk_start
+        end = min(start + self.chunk_steps, self.time_steps)
+        self.chunk_start = end
+
+        arrival_times = list()
+        arrival_nodes = list()
+        pending = np.flatnonzero(self.next_arrival < end)
+        while len(pending) > 0:
+            arrival_times.append(self.next_arrival[pending])
+            arrival_nodes.append(pending)
+            self.next_arrival[pending] += self.__draw_gaps(len(pending))
+            pending = pending[self.next_arrival[pending] < end]
+
+        if len(arrival_times) == 0:
+            self.current_chunk = start, end, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        else:
+            times = np.concatenate(arrival_times)
+            nodes = np.concatenate(arrival_nodes)
+            order = np.lexsort((nodes, times))
+            self.current_chunk = start, end, times[order], nodes[order]
+        return self.current_chunk
+
+    def iter_chunks(self, start_index: int = 0) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+        """
+        Continue from 'start_index', which has to lie in the current chunk or at the start of the next one.
+        """
+        if self.current_chunk is not None and self.current_chunk[0] <= start_index < self.current_chunk[1]:
+            yield self.current_chunk
+        else:
+            assert start_index == self.chunk_start
+        while self.chunk_start < self.time_steps:
+            yield self.next_chunk()
+
+
+class TraceReader(object):
+    """
+    Incremental reader of a single arrival trace file, sorted by time: one 'node,time' line per arrival, '#' starts
+    a comment. Lines are parsed 'block_rows' at a time and only the arrivals not handed out yet are kept.
+    """
+
+    def __init__(self, trace_file: TextIO, name: str, num_nodes: int, delta_time: float, block_rows: int):
+        self.trace_file = trace_file
+        self.name = name
+        self.num_nodes = num_nodes
+        self.delta_time = delta_time
+        self.block_rows = block_rows
+        self.times = np.zeros(0, dtype=np.int64)
+        self.nodes = np.zeros(0, dtype=np.int64)
+        self.last_time = 0
+        self.exhausted = False
+
+    def __read_block(self):
+        block = list(itertools.islice(self.trace_file, self.block_rows))
+        if len(block) == 0:
+            self.exhausted = True
+            return
+        # Blank and comment lines are dropped first, loadtxt warns about a block without data
+        lines = [line for line in block if line.split('#', 1)[0].strip()]
+        if len(lines) == 0:
+            return
+        rows = np.loadtxt(lines, delimiter=',', comments='#', ndmin=2)
+        nodes = rows[:, 0].astype(np.int64)
+        times = np.floor(rows[:, 1] / self.delta_time).astype(np.int64)
+        if np.any(nodes < 0) or np.any(nodes >= self.num_nodes):
+            raise ValueError("Trace {} refers to a node outside 0..{}".format(self.name, self.num_nodes - 1))
+        if times[0] < self.last_time or np.any(np.diff(times) < 0) or times[0] < 0:
+            raise ValueError("Trace {} is not sorted by time".format(self.name))
+        self.last_time = int(times[-1])
+        self.times = np.concatenate((self.times, times))
+        self.nodes = np.concatenate((self.nodes, nodes))
+
+    def take_until(self, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Remove and return the arrivals before time index 'end'.
+        """
+        while not self.exhausted and (len(self.times) == 0 or self.times[-1] < end):
+            self.__read_block()
+        split = np.searchsorted(self.times, end)
+        times, self.times = self.times[:split], self.times[split:]
+        nodes, self.nodes = self.nodes[:split], self.nodes[split:]
+        return times, nodes
+
+
+class ArrivalTrace(ArrivalSource):
+    """
+    Arrivals replayed from recorded or synthetic trace files instead of drawn from a Bernoulli process.
+    Every file holds 'node,time' lines sorted by time, with the node index (0..num_nodes-1) and the time in units of
+    'delta_time'. Several files (for example one per traffic source) are merged in time order. Files are read in
+    blocks and handed out in chunks of 'chunk_steps' time steps, so a trace never has to fit in memory.
+    A node gets at most one new message per time step; further arrivals of that node in the same step are merged
+    and counted in 'num_merged_arrivals'. Arrivals at or after 'time_steps' are not read.
+    """
+
+    def __init__(self, paths: Union[str, List[str]], num_nodes: int, time_steps: int, delta_time: float = 1,
+                 chunk_steps: int = 1024, block_rows: int = 65536):
+        assert delta_time > 0 and chunk_steps > 0 and block_rows > 0
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.num_nodes = num_nodes
+        self.time_steps = time_steps
+        self.delta_time = delta_time
+        self.chunk_steps = chunk_steps
+        self.block_rows = block_rows
+        self.num_arrivals = 0
+        self.num_merged_arrivals = 0
+
+    def iter_chunks(self, start_index: int = 0) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+        """
+        Read the files from the start, arrivals before 'start_index' are skipped block by block.
+        """
+        if start_index == 0:
+            self.num_arrivals = 0
+            self.num_merged_arrivals = 0
+        trace_files = [open(path) for path in self.paths]
+        try:
+            readers = [TraceReader(trace_file, path, self.num_nodes, self.delta_time, self.block_rows)
+                       for trace_file, path in zip(trace_files, self.paths)]
+            for reader in readers:
+                reader.take_until(start_index)
+            for start in range(start_index, self.time_steps, self.chunk_steps):
+                end = min(start + self.chunk_steps, self.time_steps)
+                chunk = [reader.take_until(end) for reader in readers]
+                times = np.concatenate([times for times, _ in chunk])
+                nodes = np.concatenate([nodes for _, nodes in chunk])
+                # Sorted by time index and then node, without repeated arrivals of a node within a step
+                keys = np.unique(times * self.num_nodes + nodes)
+                self.num_arrivals += len(keys)
+                self.num_merged_arrivals += len(times) - len(keys)
+                yield start, end, keys // self.num_nodes, keys % self.num_nodes
+        finally:
+            for trace_file in trace_files:
+                trace_file.close()
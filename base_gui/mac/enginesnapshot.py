@@ -0,0 +1,105 @@
+import io
+import pickle
+import random
+from typing import List, Tuple, Dict, Any
+
+import attr
+
+from base_gui.mac.actorstate import ActorState
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.oracleengine import OracleEngine
+from base_gui.mac.vectorizedengine import VectorizedMacEngine
+
+
+class StatePickler(pickle.Pickler):
+    """
+    Pickles the actor states of a network one level deep: references to the actors themselves are written as their
+    index and the module-level generator and 'shared' objects (read-only structures such as the neighbour table) by
+    name. Following the neighbour references instead would recurse once per node of a connected component.
+    """
+
+    def __init__(self, file, states: List[ActorState], shared: tuple):
+        super(StatePickler, self).__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.state_indices = {id(state): index for index, state in enumerate(states)}
+        self.shared_indices = {id(shared_object): index for index, shared_object in enumerate(shared)}
+
+    def persistent_id(self, obj):
+        if obj is random:
+            return 'random', 0
+        index = self.state_indices.get(id(obj))
+        if index is not None:
+            return 'actor', index
+        index = self.shared_indices.get(id(obj))
+        if index is not None:
+            return 'shared', index
+        return None
+
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, shared: tuple):
+        super(StateUnpickler, self).__init__(file)
+        self.shared = shared
+        # Actors are created empty on first reference and filled in once their own slots are read
+        self.states: Dict[int, ActorState] = dict()
+
+    def state(self, index: int) -> ActorState:
+        if index not in self.states:
+            self.states[index] = ActorState.__new__(ActorState)
+        return self.states[index]
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind == 'random':
+            return random
+        if kind == 'actor':
+            return self.state(index)
+        return self.shared[index]
+
+
+@attr.attrs(auto_attribs=True, frozen=True)
+class EngineSnapshot(object):
+    """
+    Complete, restorable state of an engine after simulating time index 'time_index' (-1 before the first step):
+    the actor states and their message pool (object engine) or the whole VectorizedMacEngine, serialized, plus the
+    state of the module-level generator used by nodes without a generator of their own.
+    A snapshot is never changed, every restore hands out fresh objects, so it can seed any number of runs. It can be
+    pickled as a whole; 'shared' holds the read-only objects the engine refers to, stored once.
+    """
+    engine: OracleEngine
+    time_index: int
+    random_state: tuple
+    payload: bytes
+    shared: tuple = ()
+
+    @staticmethod
+    def __dump(obj: Any, states: List[ActorState], shared: tuple) -> bytes:
+        buffer = io.BytesIO()
+        StatePickler(buffer, states, shared).dump(obj)
+        return buffer.getvalue()
+
+    @staticmethod
+    def capture_actors(time_index: int, states: List[ActorState], message_pool: MessagePool) -> 'EngineSnapshot':
+        assert all(state.transit_listener is None and state.arrival_index.delta_listener is None for state in states)
+        slots = [[getattr(state, name) for name in ActorState.__slots__] for state in states]
+        payload = EngineSnapshot.__dump((slots, message_pool), states, ())
+        return EngineSnapshot(OracleEngine.OBJECT, time_index, random.getstate(), payload)
+
+    @staticmethod
+    def capture_engine(time_index: int, mac_engine: VectorizedMacEngine) -> 'EngineSnapshot':
+        shared = (mac_engine.neighbour_table, mac_engine.positions, mac_engine.identifiers)
+        payload = EngineSnapshot.__dump(mac_engine, [], shared)
+        return EngineSnapshot(OracleEngine.VECTORIZED, time_index, random.getstate(), payload, shared)
+
+    def restore_actors(self) -> Tuple[List[ActorState], MessagePool]:
+        assert self.engine is OracleEngine.OBJECT
+        unpickler = StateUnpickler(io.BytesIO(self.payload), self.shared)
+        slots, message_pool = unpickler.load()
+        states = [unpickler.state(index) for index in range(len(slots))]
+        for state, values in zip(states, slots):
+            for name, value in zip(ActorState.__slots__, values):
+                setattr(state, name, value)
+        return states, message_pool
+
+    def restore_engine(self) -> VectorizedMacEngine:
+        assert self.engine is OracleEngine.VECTORIZED
+        return StateUnpickler(io.BytesIO(self.payload), self.shared).load()
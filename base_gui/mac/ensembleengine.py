@@ -0,0 +1,68 @@
+from typing import List
+
+import numpy as np
+
+from base_gui.mac.arrivalschedule import ArrivalSchedule
+from base_gui.mac.macprotocol import MacProtocol
+from base_gui.mac.neighbourtable import NeighbourTable
+from base_gui.mac.noderandomstream import NodeRandomStream
+from base_gui.mac.queuedroppolicy import QueueDropPolicy
+from base_gui.mac.simstatistics import Statistics
+from base_gui.mac.vectorizedengine import VectorizedMacEngine
+
+
+class EnsembleMacEngine(object):
+    """
+    'num_replicas' independent runs of one topology stepped together by a single VectorizedMacEngine.
+    The replicas are disjoint copies of the network, replica r holds engine nodes r * num_nodes .. (r + 1) * num_nodes,
+    so every state array of the engine reshapes to a (num_replicas, num_nodes, ...) view with a leading replica axis.
+    Each NumPy call covers all replicas. Only statistics are produced, there is no per-step history.
+    'seed' spawns one seed per replica, which seeds the NodeRandomStream of every node of that replica, and one for
+    the arrivals, so a seeded ensemble is reproducible and its replicas draw from independent streams.
+    """
+
+    def __init__(self, identifiers: List[str], positions: np.ndarray, neighbour_table: NeighbourTable,
+                 num_replicas: int, protocol: MacProtocol = None, queue_limit: int = None,
+                 queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP, seed: int = None):
+        assert num_replicas > 0
+        self.num_replicas = num_replicas
+        self.num_nodes = len(positions)
+        rngs = None
+        self.arrival_generator = None
+        if seed is not None:
+            replica_seeds = np.random.SeedSequence(seed).spawn(num_replicas + 1)
+            rngs = [NodeRandomStream(node_seed) for replica_seed in replica_seeds[:num_replicas]
+                    for node_seed in replica_seed.generate_state(self.num_nodes).tolist()]
+            self.arrival_generator = np.random.default_rng(replica_seeds[num_replicas])
+        self.mac_engine = VectorizedMacEngine(identifiers * num_replicas, np.tile(positions, (num_replicas, 1)),
+                                              neighbour_table.replicate(num_replicas), rngs=rngs, protocol=protocol,
+                                              queue_limit=queue_limit, queue_drop_policy=queue_drop_policy)
+
+    def replica_view(self, array: np.ndarray) -> np.ndarray:
+        """
+        View of an engine state array with a leading replica axis.
+        """
+        return array.reshape((self.num_replicas, self.num_nodes) + array.shape[1:])
+
+    def run(self, time_steps: int, transmission_chance: float):
+        arrival_schedule = ArrivalSchedule(self.num_replicas * self.num_nodes, time_steps, transmission_chance,
+                                           generator=self.arrival_generator)
+        for new_messages in arrival_schedule.iter_steps():
+            self.mac_engine.prop_messages()
+            self.mac_engine.progress_time(new_messages)
+
+    def get_replica_statistics(self) -> List[Statistics]:
+        mac_engine = self.mac_engine
+        counters = {name: self.replica_view(getattr(mac_engine, name)).sum(axis=1).tolist()
+                    for name in ('num_collisions', 'num_dropped_messages', 'num_queue_drops',
+                                 'num_successful_transmissions', 'num_transmission_attempts', 'num_messages')}
+        replica_statistics = list()
+        for replica in range(self.num_replicas):
+            replica_stats = Statistics()
+            for name, totals in counters.items():
+                setattr(replica_stats, name, totals[replica])
+            for node in range(replica * self.num_nodes, (replica + 1) * self.num_nodes):
+                replica_stats.transmission_times.extend(mac_engine.transmission_times[node])
+            replica_stats.transmission_time_stats()
+            replica_statistics.append(replica_stats)
+        return replica_statistics
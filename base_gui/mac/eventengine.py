@@ -0,0 +1,152 @@
+import heapq
+from typing import List, Tuple, Set, Iterator
+
+import numpy as np
+
+from base_gui.mac.actorstatehistory import ActorStateHistory
+from base_gui.mac.arrivalschedule import ArrivalSource
+from base_gui.mac.historystore import HistoryStore, HistoryRecorder
+from base_gui.mac.memoryceiling import MemoryCeiling
+
+
+class EventMacEngine(object):
+    """
+    Discrete-event driver for the same ActorStateHistory actors the fixed-step loop uses.
+    An event calendar of (time index, actor index) only steps an actor at arrivals, at boundaries of its arrival
+    intervals (wave fronts entering/leaving), while it transmits, jams or has waves in the air, and at backoff expiry.
+    Quiet stretches are skipped with ActorState.skip_to, so cost follows the number of events instead of
+    time steps x nodes. Within a time index actors are stepped in index order, which keeps random draws identical to
+    the fixed-step engine.
+    At moderate load most actors are woken every time index anyway and the calendar only adds cost, so once more than
+    DENSE_LOAD of the actors were woken per time index over DENSE_WINDOW time indices, the rest of the run steps
+    every actor every time index like the fixed-step engine ('dense_from').
+    """
+    DENSE_LOAD = 0.4
+    DENSE_WINDOW = 64
+
+    def __init__(self, actors: List[ActorStateHistory], time_steps: int):
+        self.actors = actors
+        self.time_steps = time_steps
+        self.calendar: List[Tuple[int, int]] = list()
+        self.num_events = 0
+        # Time index from which every actor was stepped every time index, None while events drive the run
+        self.dense_from: int = None
+
+        for actor_index, actor in enumerate(self.actors):
+            actor.state.arrival_index.delta_listener = self.__listener(actor_index)
+
+    def __listener(self, actor_index: int):
+        return lambda time_index: self.schedule(time_index, actor_index)
+
+    def schedule(self, time_index: int, actor_index: int):
+        if time_index < self.time_steps:
+            heapq.heappush(self.calendar, (time_index, actor_index))
+
+    def run(self, arrival_schedule: ArrivalSource, memory_ceiling: MemoryCeiling = None) -> HistoryStore:
+        """
+        Simulate all time steps, pulling arrivals from the schedule one chunk at a time.
+        Returns the (time_steps, num_nodes) history, re-using the recorded cell of an actor over steps it was quiet.
+        The history is shorter than time_steps if the memory ceiling was reached.
+        """
+        arrival_chunks = arrival_schedule.iter_chunks()
+        arrivals: Set[Tuple[int, int]] = set()
+        loaded_until = 0
+
+        # Per actor: the time indices at which its state changed, and the history cells recorded for them
+        recorder = HistoryRecorder([actor.identifier for actor in self.actors],
+                                   [actor.state.transmission_times for actor in self.actors])
+        changed_at: List[List[int]] = [[0] for _ in self.actors]
+        cells: List[List[int]] = [[recorder.record_state(actor.state)] for actor in self.actors]
+        window_start = 0
+        window_events = 0
+
+        while True:
+            if loaded_until < self.time_steps and (len(self.calendar) == 0 or self.calendar[0][0] >= loaded_until):
+                _, loaded_until, arrival_times, arrival_nodes = next(arrival_chunks)
+                for time_index, actor_index in zip(arrival_times.tolist(), arrival_nodes.tolist()):
+                    arrivals.add((time_index, actor_index))
+                    self.schedule(time_index, actor_index)
+                continue
+            if len(self.calendar) == 0:
+                break
+
+            time_index = self.calendar[0][0]
+            if memory_ceiling is not None and memory_ceiling.exceeded(time_index):
+                self.time_steps = time_index
+                break
+            woken: List[int] = list()
+            while len(self.calendar) > 0 and self.calendar[0][0] == time_index:
+                _, actor_index = heapq.heappop(self.calendar)
+                if len(woken) == 0 or woken[-1] != actor_index:
+                    woken.append(actor_index)
+
+            for actor_index in woken:
+                actor = self.actors[actor_index]
+                actor.state.skip_to(time_index)
+                actor.prop_messages()
+                new_message = (time_index, actor_index) in arrivals
+                if new_message:
+                    arrivals.discard((time_index, actor_index))
+                actor.progress_time(new_message)
+            self.num_events += len(woken)
+            window_events += len(woken)
+
+            # Record after every woken actor progressed, neighbours with waves in the air are always among them
+            for actor_index in woken:
+                state = self.actors[actor_index].state
+                if changed_at[actor_index][-1] == time_index:
+                    cells[actor_index][-1] = recorder.record_state(state)
+                else:
+                    changed_at[actor_index].append(time_index)
+                    cells[actor_index].append(recorder.record_state(state))
+                next_index = state.next_event_index()
+                if next_index is not None:
+                    self.schedule(next_index, actor_index)
+
+            window_steps = time_index + 1 - window_start
+            if window_steps >= self.DENSE_WINDOW:
+                if window_events > self.DENSE_LOAD * window_steps * len(self.actors) and \
+                        time_index + 1 < self.time_steps:
+                    self.dense_from = time_index + 1
+                    self.__run_dense(arrival_chunks, arrivals, loaded_until, recorder, memory_ceiling)
+                    break
+                window_start, window_events = time_index + 1, 0
+
+        dense_end = self.time_steps if self.dense_from is None else self.dense_from
+        cell_ids = np.empty((self.time_steps, len(self.actors)), dtype=np.int64)
+        for actor_index in range(len(self.actors)):
+            ends = changed_at[actor_index][1:] + [self.time_steps]
+            for start, end, cell in zip(changed_at[actor_index], ends, cells[actor_index]):
+                cell_ids[start:min(end, dense_end), actor_index] = cell
+        if self.dense_from is not None and self.time_steps > self.dense_from:
+            cell_ids[self.dense_from:] = np.stack(recorder.row_cells)
+        return recorder.store(cell_ids)
+
+    def __run_dense(self, arrival_chunks: Iterator[Tuple[int, int, np.ndarray, np.ndarray]],
+                    arrivals: Set[Tuple[int, int]], loaded_until: int, recorder: HistoryRecorder,
+                    memory_ceiling: MemoryCeiling):
+        """
+        Step every actor in every time index from 'dense_from' on, recording a row per time index. Actors that were
+        not due are quiet up to there, so they are skipped forward first.
+        """
+        states = [actor.state for actor in self.actors]
+        self.calendar.clear()
+        for state in states:
+            state.arrival_index.delta_listener = None
+            state.skip_to(self.dense_from)
+        for time_index in range(self.dense_from, self.time_steps):
+            if memory_ceiling is not None and memory_ceiling.exceeded(time_index):
+                self.time_steps = time_index
+                break
+            if time_index >= loaded_until:
+                _, loaded_until, arrival_times, arrival_nodes = next(arrival_chunks)
+                arrivals.update(zip(arrival_times.tolist(), arrival_nodes.tolist()))
+            for actor in self.actors:
+                actor.prop_messages()
+            for actor_index, actor in enumerate(self.actors):
+                new_message = (time_index, actor_index) in arrivals
+                if new_message:
+                    arrivals.discard((time_index, actor_index))
+                actor.progress_time(new_message)
+            self.num_events += len(self.actors)
+            recorder.record_states(states)
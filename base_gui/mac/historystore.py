@@ -0,0 +1,502 @@
+import copy
+from typing import List, Tuple, Union, Iterable, Set
+
+import numpy as np
+
+from base_gui.mac.actorstate import ActorState, FrozenActorState
+from base_gui.mac.macstate import MacState
+from base_gui.mac.message import Message, ImmutableMessage
+from base_gui.mac.messagetype import MessageType
+
+# Counters of FrozenActorState, in the column order of the counter arrays
+COUNTERS = ('num_successful_transmissions', 'num_transmission_attempts', 'num_collisions', 'num_dropped_messages',
+            'num_messages', 'num_queue_drops')
+# Message lists of FrozenActorState, in the column order of the message counts
+MESSAGE_LISTS = ('neighbour_messages_carriersense', 'queued_messages', 'in_transit_messages')
+
+# Message types are stored as their index in TYPE_BY_CODE
+TYPE_BY_CODE = tuple(MessageType)
+CODE_BY_TYPE = {message_type: code for code, message_type in enumerate(TYPE_BY_CODE)}
+
+# Fields of a message that are fixed when it is created, one row per packet id
+PACKET_DTYPE = np.dtype([('packet_id', np.int64), ('origin_x', np.float64), ('origin_y', np.float64),
+                         ('max_range', np.float64), ('type', np.int8), ('retransmission_parent', np.int64),
+                         ('attempt_count', np.int16), ('original_start_time', np.float64)])
+# A message as held by a node at one time index, the fields that change while it travels
+OBSERVATION_DTYPE = np.dtype([('packet_id', np.int64), ('prop_distance', np.float64),
+                              ('prop_packet_length', np.float64)])
+
+
+def packet_row(message: Message) -> tuple:
+    return (message.packet_id, message.origin_position[0], message.origin_position[1], message.max_range,
+            CODE_BY_TYPE[message.type], message.retransmission_parent, message.attempt_count,
+            message.original_start_time)
+
+
+def index_dtype(num_cells: int):
+    return np.int32 if num_cells <= np.iinfo(np.int32).max else np.int64
+
+
+def offsets_of(counts: np.ndarray) -> np.ndarray:
+    """
+    Start of every run of 'counts' consecutive entries, followed by the total.
+    """
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def ranges_index(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Indices of the ranges starts[i]..starts[i]+counts[i]-1 after each other.
+    """
+    offsets = offsets_of(counts)
+    return np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+
+
+class HistoryStore(object):
+    """
+    Columnar (time_steps, num_nodes) history of a run, indexed like the array of FrozenActorState it replaces:
+    'store[t]' is the list of node states at time index t, 'store[t, node]' one state and 'store[a:b]' the rows
+    a..b-1 as a store sharing these arrays. States are built on access.
+    cell_index[t, node] points into a table of distinct cells: MAC state, counters and message list lengths as typed
+    columns. The queued and in-transit messages of the cells follow each other in 'observations', the carrier sense
+    entries in 'sensed' as packet ids only: a node senses the in-transit messages of its neighbours, so their
+    distance and length are those of the in-transit observation with that id in the same row. A node that did not
+    change keeps pointing at its previous cell.
+    The fixed fields of every message are kept once in 'packets', sorted by packet id. Transmission times are kept
+    once per node, every frozen state referred to the list of its node.
+    The leading rows may be those of another store, 'prefix' (see chain), followed by the rows of cell_index.
+    """
+
+    def __init__(self, identifiers: List[str], transmission_times: List[list], cell_index: np.ndarray,
+                 mac_state: np.ndarray, counters: np.ndarray, message_counts: np.ndarray, observations: np.ndarray,
+                 sensed: np.ndarray, packets: np.ndarray):
+        assert len(mac_state) == len(counters) == len(message_counts)
+        self.identifiers = identifiers
+        self.transmission_times = transmission_times
+        self.cell_index = cell_index
+        self.mac_state = mac_state
+        self.counters = counters
+        self.message_counts = message_counts
+        self.observations = observations
+        self.sensed = sensed
+        self.packets = packets
+        self.message_offsets = offsets_of(message_counts[:, 1:].sum(axis=1))
+        self.sense_offsets = offsets_of(message_counts[:, 0])
+        assert len(observations) == self.message_offsets[-1] and len(sensed) == self.sense_offsets[-1]
+        self.prefix: HistoryStore = None
+        # In-transit observations of the last row that was accessed, sorted by packet id
+        self.transit_row: Tuple[int, np.ndarray] = (None, None)
+
+    @property
+    def num_prefix_rows(self) -> int:
+        return len(self.prefix) if self.prefix is not None else 0
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.num_prefix_rows + self.cell_index.shape[0], self.cell_index.shape[1]
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of the arrays this store refers to, those of the prefix included.
+        """
+        return sum(array.nbytes for array in (self.cell_index, self.mac_state, self.counters, self.message_counts,
+                                              self.message_offsets, self.sense_offsets, self.observations,
+                                              self.sensed, self.packets)) + \
+            (self.prefix.nbytes if self.prefix is not None else 0)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key: Union[int, slice, Tuple[int, int]]) -> Union[List[FrozenActorState], FrozenActorState,
+                                                                          'HistoryStore']:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            assert step == 1
+            return self.rows(start, max(start, stop))
+        if isinstance(key, tuple):
+            return self.state(*key)
+        return self.row(key)
+
+    def __local(self, time_index: int) -> Tuple['HistoryStore', int]:
+        # The store whose cell_index holds row 'time_index', and the row in it
+        if time_index < 0:
+            time_index += len(self)
+        if not 0 <= time_index < len(self):
+            raise IndexError("time index {} out of {} rows".format(time_index, len(self)))
+        if time_index < self.num_prefix_rows:
+            return self.prefix.__local(time_index)
+        return self, time_index - self.num_prefix_rows
+
+    def counter(self, name: str, time_index: int) -> np.ndarray:
+        """
+        One of COUNTERS for every node at 'time_index'.
+        """
+        store, row = self.__local(time_index)
+        return store.counters[store.cell_index[row], COUNTERS.index(name)]
+
+    def row(self, time_index: int) -> List[FrozenActorState]:
+        store, row = self.__local(time_index)
+        return [store.__state(row, node) for node in range(self.shape[1])]
+
+    def state(self, time_index: int, node: int) -> FrozenActorState:
+        store, row = self.__local(time_index)
+        return store.__state(row, node)
+
+    def __state(self, row: int, node: int) -> FrozenActorState:
+        cell = self.cell_index[row, node]
+        sensed = self.sensed[self.sense_offsets[cell]:self.sense_offsets[cell + 1]]
+        transit = self.__transit(row)
+        observations = np.concatenate((transit[np.searchsorted(transit['packet_id'], sensed)],
+                                       self.observations[self.message_offsets[cell]:self.message_offsets[cell + 1]]))
+        packets = self.packets[np.searchsorted(self.packets['packet_id'], observations['packet_id'])].tolist()
+        messages = [self.__immutable_message(packet, distance, length)
+                    for packet, (_, distance, length) in zip(packets, observations.tolist())]
+        message_lists = list()
+        start = 0
+        for count in self.message_counts[cell].tolist():
+            message_lists.append(tuple(messages[start:start + count]))
+            start += count
+        return FrozenActorState(macState=MacState(int(self.mac_state[cell])),
+                                identifier=self.identifiers[node],
+                                transmission_times=self.transmission_times[node],
+                                **dict(zip(MESSAGE_LISTS, message_lists)),
+                                **dict(zip(COUNTERS, self.counters[cell].tolist())))
+
+    def __transit(self, row: int) -> np.ndarray:
+        # In-transit observations of all nodes in row 'row' of cell_index, sorted by packet id
+        if self.transit_row[0] != row:
+            cells = self.cell_index[row]
+            counts = self.message_counts[cells, 2]
+            transit = self.observations[ranges_index(self.message_offsets[cells + 1] - counts, counts)]
+            self.transit_row = (row, transit[np.argsort(transit['packet_id'])])
+        return self.transit_row[1]
+
+    @staticmethod
+    def __immutable_message(packet: tuple, distance: float, length: float) -> ImmutableMessage:
+        packet_id, origin_x, origin_y, max_range, code, parent, attempt, start_time = packet
+        return ImmutableMessage(length, np.array((origin_x, origin_y)), packet_id, max_range, TYPE_BY_CODE[code],
+                                distance, parent, attempt, start_time)
+
+    def __cell_table(self) -> tuple:
+        return self.mac_state, self.counters, self.message_counts, self.observations, self.sensed, self.packets
+
+    def rows(self, start: int, stop: int) -> 'HistoryStore':
+        """
+        Rows start..stop-1, sharing the arrays of this store (see compacted).
+        """
+        num_prefix_rows = self.num_prefix_rows
+        if stop <= num_prefix_rows:
+            return self.prefix.rows(start, stop)
+        rows = copy.copy(self)
+        rows.cell_index = self.cell_index[max(start - num_prefix_rows, 0):stop - num_prefix_rows]
+        rows.prefix = self.prefix.rows(start, num_prefix_rows) if start < num_prefix_rows else None
+        rows.transit_row = (None, None)
+        return rows
+
+    def __with_transmission_times(self, transmission_times: List[list]) -> 'HistoryStore':
+        store = copy.copy(self)
+        store.transmission_times = transmission_times
+        if store.prefix is not None:
+            store.prefix = store.prefix.__with_transmission_times(transmission_times)
+        return store
+
+    @staticmethod
+    def chain(prefix: 'HistoryStore', store: 'HistoryStore') -> 'HistoryStore':
+        """
+        Rows of 'prefix' followed by those of 'store', referring to the arrays of 'prefix' instead of copying them
+        (a fork keeps the rows of its parent up to the fork point). The transmission times are those of 'store'.
+        """
+        assert store.prefix is None
+        if len(prefix) == 0:
+            return store
+        chained = copy.copy(store)
+        chained.prefix = prefix.__with_transmission_times(store.transmission_times)
+        chained.transit_row = (None, None)
+        return chained
+
+    def compacted(self) -> 'HistoryStore':
+        """
+        Copy holding only the cells, observations and packets its rows refer to, without a prefix.
+        """
+        if self.prefix is not None:
+            return HistoryStore.concatenate([self.prefix, self.rows(self.num_prefix_rows, len(self))])
+        return HistoryStore.gather(self.identifiers, self.transmission_times, self.cell_index, *self.__cell_table())
+
+    @staticmethod
+    def gather(identifiers: List[str], transmission_times: List[list], cell_ids: np.ndarray, mac_state: np.ndarray,
+               counters: np.ndarray, message_counts: np.ndarray, observations: np.ndarray, sensed: np.ndarray,
+               packets: np.ndarray) -> 'HistoryStore':
+        """
+        Store with cell cell_ids[t, node] of the given cell table at every (time index, node), holding only the cells
+        that are used. The observations and sensed ids of the table follow the cell order, 'packets' are sorted by
+        packet id.
+        """
+        cells, cell_index = np.unique(cell_ids, return_inverse=True)
+        message_offsets = offsets_of(message_counts[:, 1:].sum(axis=1))
+        sense_offsets = offsets_of(message_counts[:, 0])
+        used_observations = observations[ranges_index(message_offsets[cells],
+                                                      message_offsets[cells + 1] - message_offsets[cells])]
+        used_sensed = sensed[ranges_index(sense_offsets[cells], message_counts[cells, 0])]
+        packet_ids = np.unique(np.concatenate((used_observations['packet_id'], used_sensed)))
+        return HistoryStore(identifiers, transmission_times,
+                            cell_index.reshape(cell_ids.shape).astype(index_dtype(len(cells))),
+                            mac_state[cells], counters[cells], message_counts[cells], used_observations, used_sensed,
+                            packets[np.searchsorted(packets['packet_id'], packet_ids)])
+
+    @staticmethod
+    def __joined_cells(stores: List['HistoryStore']) -> Tuple[List[int], tuple]:
+        # Cell tables of all stores after each other: the first cell of every store and the joined columns
+        assert all(store.prefix is None for store in stores)
+        cell_bases = np.cumsum([0] + [len(store.mac_state) for store in stores]).tolist()
+        packets = np.concatenate([store.packets for store in stores])
+        _, first = np.unique(packets['packet_id'], return_index=True)
+        return cell_bases, (np.concatenate([store.mac_state for store in stores]),
+                            np.concatenate([store.counters for store in stores]),
+                            np.concatenate([store.message_counts for store in stores]),
+                            np.concatenate([store.observations for store in stores]),
+                            np.concatenate([store.sensed for store in stores]),
+                            packets[first])
+
+    @staticmethod
+    def concatenate(stores: List['HistoryStore']) -> 'HistoryStore':
+        """
+        Rows of all stores after each other. The transmission times are those of the last store, the lists only grow.
+        Packet ids are only unique within the rows of a run (a fork allocates the ids its parent used after the fork
+        point again), so the stores are compacted first.
+        """
+        stores = [store.compacted() for store in stores]
+        cell_bases, cell_table = HistoryStore.__joined_cells(stores)
+        cell_ids = np.concatenate([store.cell_index.astype(np.int64) + base
+                                   for store, base in zip(stores, cell_bases)])
+        return HistoryStore.gather(stores[0].identifiers, stores[-1].transmission_times, cell_ids, *cell_table)
+
+    @staticmethod
+    def merge_columns(num_nodes: int, parts: Iterable[Tuple[np.ndarray, 'HistoryStore']]) -> 'HistoryStore':
+        """
+        History of 'num_nodes' nodes from stores of the same length that each hold the columns of the given nodes.
+        """
+        parts = list(parts)
+        stores = [part for _, part in parts]
+        cell_bases, cell_table = HistoryStore.__joined_cells(stores)
+        cell_ids = np.zeros((len(stores[0]), num_nodes), dtype=np.int64)
+        identifiers: List[str] = [None] * num_nodes
+        transmission_times: List[list] = [None] * num_nodes
+        for (nodes, part), base in zip(parts, cell_bases):
+            assert len(part) == len(cell_ids)
+            cell_ids[:, nodes] = part.cell_index + base
+            for node, identifier, times in zip(nodes.tolist(), part.identifiers, part.transmission_times):
+                identifiers[node] = identifier
+                transmission_times[node] = times
+        return HistoryStore.gather(identifiers, transmission_times, cell_ids, *cell_table)
+
+
+class GrowingColumn(object):
+    """
+    Array that grows along its first axis, doubling its capacity when full.
+    """
+
+    def __init__(self, dtype, width: int = None):
+        self.shape_tail = () if width is None else (width,)
+        self.array = np.zeros((256,) + self.shape_tail, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values: np.ndarray):
+        end = self.size + len(values)
+        if end > len(self.array):
+            grown = np.zeros((max(end, 2 * len(self.array)),) + self.shape_tail, dtype=self.array.dtype)
+            grown[:self.size] = self.array[:self.size]
+            self.array = grown
+        self.array[self.size:end] = values
+        self.size = end
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.array[:self.size]
+
+
+class HistoryRecorder(object):
+    """
+    Encodes node states into history cells while a run goes on, without freezing them. Cells are numbered in
+    recording order and laid out as a (time index, node) HistoryStore by 'store'. Engines that record all nodes every
+    step (record_states, record_columns) keep the cell of a node without messages that did not change, see 'rows'.
+    Cells of single states are buffered as tuples and moved into the columns in blocks.
+    """
+    FLUSH_CELLS = 4096
+
+    def __init__(self, identifiers: List[str], transmission_times: List[list]):
+        self.identifiers = identifiers
+        # The live lists of the nodes, complete once the run is over
+        self.transmission_times = transmission_times
+        self.num_cells = 0
+        self.mac_state = GrowingColumn(np.int8)
+        self.counters = GrowingColumn(np.int32, len(COUNTERS))
+        self.message_counts = GrowingColumn(np.int32, len(MESSAGE_LISTS))
+        self.observations = GrowingColumn(OBSERVATION_DTYPE)
+        self.sensed = GrowingColumn(np.int64)
+        self.packets = GrowingColumn(PACKET_DTYPE)
+        self.packet_ids: Set[int] = set()
+        # Buffered cells: (mac state, *counters, *message counts)
+        self.pending_cells: List[tuple] = list()
+        self.pending_observations: List[tuple] = list()
+        self.pending_sensed: List[int] = list()
+        self.pending_packets: List[tuple] = list()
+        # Cells of every recorded row, and the last row as (cells, MAC states, counters, nodes with messages) to
+        # compare the next one with
+        self.row_cells: List[np.ndarray] = list()
+        self.last_columns: Tuple[np.ndarray, ...] = None
+
+    def __cell(self, state: ActorState) -> Tuple[tuple, tuple]:
+        message_lists = (state.get_neighbour_messages_carriersense(), state.queued_messages, state.in_transit_messages)
+        return (state.state.value, state.num_successful_transmissions, state.num_transmission_attempts,
+                state.num_collisions, state.num_dropped_messages, state.num_messages, state.num_queue_drops,
+                *(len(messages) for messages in message_lists)), message_lists
+
+    def __append_cell(self, cell: tuple, message_lists: tuple) -> int:
+        for kind, messages in enumerate(message_lists):
+            for message in messages:
+                if kind == 0:
+                    self.pending_sensed.append(message.packet_id)
+                else:
+                    self.pending_observations.append((message.packet_id, message.prop_distance,
+                                                      message.prop_packet_length))
+                self.__add_packet(message)
+        self.pending_cells.append(cell)
+        cell_id = self.num_cells
+        self.num_cells += 1
+        if len(self.pending_cells) >= self.FLUSH_CELLS:
+            self.flush()
+        return cell_id
+
+    def record_state(self, state: ActorState) -> int:
+        """
+        Record the current state of an actor as a new cell and return its index.
+        """
+        return self.__append_cell(*self.__cell(state))
+
+    def record_states(self, states: List[ActorState], senders: List[ActorState] = None):
+        """
+        Record the states of all nodes as the next row. The scalar fields are gathered as columns, only the nodes
+        whose cell changed are encoded message by message. 'senders' are all states whose in-transit messages the
+        nodes can sense ('states' if None), only their neighbours are carrier sensed as links are symmetric.
+        """
+        sensing = {id(neighbour) for sender in (states if senders is None else senders)
+                   if sender.in_transit_messages for neighbour in sender.neighbour_states}
+        sensed = [state.get_neighbour_messages_carriersense() if id(state) in sensing else ()
+                  for state in states]
+        mac_state = np.array([state.state.value for state in states], dtype=np.int8)
+        counters = np.array([(state.num_successful_transmissions, state.num_transmission_attempts,
+                              state.num_collisions, state.num_dropped_messages, state.num_messages,
+                              state.num_queue_drops) for state in states], dtype=np.int64).reshape(-1, len(COUNTERS))
+        message_counts = np.array([(len(node_sensed), len(state.queued_messages), len(state.in_transit_messages))
+                                   for node_sensed, state in zip(sensed, states)],
+                                  dtype=np.int64).reshape(-1, len(MESSAGE_LISTS))
+        changed = self.__record_row(mac_state, counters, message_counts)
+        for node in np.flatnonzero(changed & message_counts.any(axis=1)).tolist():
+            state = states[node]
+            for message in sensed[node]:
+                self.pending_sensed.append(message.packet_id)
+                self.__add_packet(message)
+            for messages in (state.queued_messages, state.in_transit_messages):
+                for message in messages:
+                    self.pending_observations.append((message.packet_id, message.prop_distance,
+                                                      message.prop_packet_length))
+                    self.__add_packet(message)
+
+    def record_columns(self, mac_state: np.ndarray, counters: np.ndarray, message_counts: np.ndarray,
+                       observations: np.ndarray, packets: np.ndarray):
+        """
+        Record all nodes as the next row, given as columns (see VectorizedMacEngine.history_columns). 'packets' holds
+        a row for every observation.
+        """
+        changed = self.__record_row(mac_state, counters, message_counts)
+        if len(observations) == 0:
+            return
+        # Nodes without messages may keep their cell, so all observations belong to new cells
+        kinds = np.repeat(np.tile(np.arange(len(MESSAGE_LISTS)), int(np.count_nonzero(changed))),
+                          message_counts[changed].ravel())
+        self.observations.extend(observations[kinds != 0])
+        self.sensed.extend(observations['packet_id'][kinds == 0])
+        packet_ids, first = np.unique(packets['packet_id'], return_index=True)
+        new_packets = [index for packet_id, index in zip(packet_ids.tolist(), first.tolist())
+                       if packet_id not in self.packet_ids]
+        self.packet_ids.update(packets['packet_id'][new_packets].tolist())
+        self.packets.extend(packets[new_packets])
+
+    def __add_packet(self, message: Message):
+        if message.packet_id not in self.packet_ids:
+            self.packet_ids.add(message.packet_id)
+            self.pending_packets.append(packet_row(message))
+
+    def __record_row(self, mac_state: np.ndarray, counters: np.ndarray, message_counts: np.ndarray) -> np.ndarray:
+        """
+        Append the row of cells given as columns: nodes with messages now or in the last row, or with another MAC
+        state or counter than in the last row, get a new cell, the others keep theirs. Returns the nodes with a new
+        cell, their messages have to follow in node order.
+        """
+        self.flush()
+        has_messages = message_counts.any(axis=1)
+        if self.last_columns is not None:
+            last_cells, last_mac_state, last_counters, last_has_messages = self.last_columns
+            changed = has_messages | last_has_messages | (mac_state != last_mac_state)
+            changed |= (counters != last_counters).any(axis=1)
+            if not changed.any():
+                # Rows are never written to once recorded, so an unchanged row is shared with the last one
+                self.row_cells.append(last_cells)
+                return changed
+            row = last_cells.copy()
+        else:
+            changed = np.ones(len(mac_state), dtype=bool)
+            row = np.zeros(len(mac_state), dtype=np.int64)
+        num_changed = int(np.count_nonzero(changed))
+        row[changed] = self.num_cells + np.arange(num_changed)
+        self.last_columns = (row, mac_state.copy(), counters.copy(), has_messages)
+        self.row_cells.append(row)
+        self.mac_state.extend(mac_state[changed])
+        self.counters.extend(counters[changed])
+        self.message_counts.extend(message_counts[changed])
+        self.num_cells += num_changed
+        return changed
+
+    def flush(self):
+        if len(self.pending_cells) > 0:
+            cells = np.array(self.pending_cells, dtype=np.int64)
+            num_counters = len(COUNTERS)
+            self.mac_state.extend(cells[:, 0])
+            self.counters.extend(cells[:, 1:1 + num_counters])
+            self.message_counts.extend(cells[:, 1 + num_counters:])
+            self.pending_cells.clear()
+        if len(self.pending_observations) > 0:
+            self.observations.extend(np.array(self.pending_observations, dtype=OBSERVATION_DTYPE))
+            self.pending_observations.clear()
+        if len(self.pending_sensed) > 0:
+            self.sensed.extend(np.array(self.pending_sensed, dtype=np.int64))
+            self.pending_sensed.clear()
+        if len(self.pending_packets) > 0:
+            self.packets.extend(np.array(self.pending_packets, dtype=PACKET_DTYPE))
+            self.pending_packets.clear()
+
+    def store(self, cell_ids: np.ndarray) -> HistoryStore:
+        """
+        History with the recorded cell cell_ids[t, node] at every (time index, node).
+        """
+        self.flush()
+        packets = self.packets.values
+        return HistoryStore.gather(self.identifiers, self.transmission_times, cell_ids, self.mac_state.values,
+                                   self.counters.values, self.message_counts.values, self.observations.values,
+                                   self.sensed.values, packets[np.argsort(packets['packet_id'])])
+
+    def rows(self, first_row: int, end_row: int) -> HistoryStore:
+        """
+        History of the rows first_row..end_row-1 recorded so far with record_states or record_columns.
+        """
+        rows = self.row_cells[first_row:end_row]
+        if len(rows) == 0:
+            return self.store(np.zeros((0, len(self.identifiers)), dtype=np.int64))
+        return self.store(np.stack(rows))
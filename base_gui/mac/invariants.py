@@ -0,0 +1,76 @@
+from typing import List
+
+import numpy as np
+
+from base_gui.mac.actorstate import ActorState
+from base_gui.mac.macstate import MacState
+from base_gui.mac.vectorizedengine import VectorizedMacEngine
+
+
+class InvariantError(Exception):
+    """
+    Engine state the MAC model can not reach, found by a checked run.
+    """
+
+
+def check_neighbour_references(states: List[ActorState]):
+    """
+    Every neighbour of a node is a node of the same network, listed once, and has that node as its neighbour too.
+    """
+    state_ids = {id(state) for state in states}
+    for state in states:
+        neighbour_ids = [id(neighbour) for neighbour in state.neighbour_states]
+        if len(set(neighbour_ids)) != len(neighbour_ids) or len(neighbour_ids) != len(state.neighbour_distances):
+            raise InvariantError("Neighbour list of actor {} is inconsistent.".format(state.identifier))
+        for neighbour in state.neighbour_states:
+            if id(neighbour) not in state_ids:
+                raise InvariantError("Neighbour {} state in actor's list of neighbours was dereferenced.".format(
+                    neighbour.identifier))
+            if not any(back is state for back in neighbour.neighbour_states):
+                raise InvariantError("Actor {} is a neighbour of {} but not the other way around.".format(
+                    neighbour.identifier, state.identifier))
+
+
+def check_actor_states(time_index: int, states: List[ActorState]):
+    """
+    After simulating 'time_index': at most one message on the antenna of a node and one in transit while transmitting
+    or jamming, no negative busy counts and conservation of messages: every arrival is queued, on the antenna, about
+    to be dropped after the jamming signal or counted as delivered or dropped.
+    """
+    for state in states:
+        transmitting = sum(1 for message in state.in_transit_messages if message.check_message_transmitting())
+        if transmitting > 1:
+            raise InvariantError("Actor {} transmits {} messages at time index {}.".format(
+                state.identifier, transmitting, time_index))
+        if state.state in (MacState.TRANSMITTING, MacState.JAMMING) and len(state.in_transit_messages) == 0:
+            raise InvariantError("Actor {} is {} without a message in transit at time index {}.".format(
+                state.identifier, state.state.name, time_index))
+        if state.arrival_index.busy_count < 0:
+            raise InvariantError("Actor {} has a negative busy count at time index {}.".format(
+                state.identifier, time_index))
+        pending = len(state.queued_messages) + int(state.state == MacState.TRANSMITTING) + \
+            int(state.state == MacState.JAMMING and state.drop_message)
+        accounted = state.num_successful_transmissions + state.num_dropped_messages + state.num_queue_drops + pending
+        if accounted != state.num_messages:
+            raise InvariantError("Actor {} accounts for {} out of {} messages at time index {}.".format(
+                state.identifier, accounted, state.num_messages, time_index))
+
+
+def check_vectorized_engine(time_index: int, mac_engine: VectorizedMacEngine):
+    """
+    Same invariants as check_actor_states, for the arrays of the vectorized engine.
+    """
+    if np.any(mac_engine.busy_count < 0):
+        raise InvariantError("Negative busy count of node(s) {} at time index {}.".format(
+            np.flatnonzero(mac_engine.busy_count < 0).tolist(), time_index))
+    if np.any(mac_engine.queue_count < 0):
+        raise InvariantError("Negative queue length of node(s) {} at time index {}.".format(
+            np.flatnonzero(mac_engine.queue_count < 0).tolist(), time_index))
+    pending = mac_engine.queue_count + (mac_engine.state == MacState.TRANSMITTING.value) + \
+        ((mac_engine.state == MacState.JAMMING.value) & mac_engine.drop_message)
+    accounted = mac_engine.num_successful_transmissions + mac_engine.num_dropped_messages + \
+        mac_engine.num_queue_drops + pending
+    violations = np.flatnonzero(accounted != mac_engine.num_messages)
+    if len(violations) > 0:
+        raise InvariantError("Node(s) {} do not account for all their messages at time index {}.".format(
+            violations.tolist(), time_index))
@@ -0,0 +1,241 @@
+import math
+from abc import abstractmethod, ABC
+
+import numpy as np
+
+from base_gui.mac.macstate import MacState
+
+# Message type codes of the VectorizedMacEngine state arrays (see vectorizedengine.MESSAGE_TYPES)
+TYPE_DATA = 0
+TYPE_JAMMING = 1
+TYPE_RETRANSMISSION = 2
+
+IDLE = MacState.IDLE.value
+READY_TO_TRANSMIT = MacState.READY_TO_TRANSMIT.value
+TRANSMITTING = MacState.TRANSMITTING.value
+WAIT = MacState.WAIT.value
+JAMMING = MacState.JAMMING.value
+
+
+class MacProtocol(ABC):
+    """
+    MAC kernel of the VectorizedMacEngine, called once per time step for all nodes at once.
+    New arrivals are already queued and 'busy' holds the carrier sense of every node. The kernel moves engine.state
+    (MacState values) to the next step and puts messages on the antenna or cuts them off through the engine.
+    Kernels keep no state of their own, per node state lives in the engine arrays.
+    """
+
+    @abstractmethod
+    def step(self, engine, busy: np.ndarray):
+        pass
+
+    @staticmethod
+    def start_transmissions(engine, nodes: np.ndarray, next_state: np.ndarray):
+        """
+        Put the head of the queue of 'nodes' on the antenna.
+        """
+        packet_ids, parents, attempts, start_times, types = engine.pop_front(nodes)
+        engine.current_slot[nodes] = engine.emit(nodes, packet_ids, parents, attempts, start_times, types,
+                                                 engine.data_packet_length)
+        engine.num_transmission_attempts[nodes] += 1
+        next_state[nodes] = TRANSMITTING
+
+    @staticmethod
+    def finish_transmissions(engine, nodes: np.ndarray, queued: np.ndarray, next_state: np.ndarray):
+        """
+        Count the message of 'nodes' that left the antenna as delivered.
+        """
+        engine.num_successful_transmissions[nodes] += 1
+        done_start_times = engine.wave_start_time[nodes, engine.current_slot[nodes]]
+        for node, start_time in zip(nodes, done_start_times):
+            engine.transmission_times[node].append(engine.time - start_time)
+        next_state[nodes] = np.where(queued[nodes], READY_TO_TRANSMIT, IDLE)
+
+    @staticmethod
+    def queue_retransmissions(engine, nodes: np.ndarray, slots: np.ndarray):
+        """
+        Queue a retransmission of the collided waves in 'slots' in front of the queue, returns the nodes whose
+        message exceeded max_attempts and is dropped instead.
+        """
+        attempts = engine.wave_attempt[nodes, slots]
+        drop = attempts > engine.max_attempts
+        retry = nodes[~drop]
+        if len(retry) > 0:
+            engine.push_front(retry, engine.new_packet_ids(len(retry)), engine.wave_packet_id[retry, slots[~drop]],
+                              attempts[~drop] + 1, engine.wave_start_time[retry, slots[~drop]],
+                              np.full(len(retry), TYPE_RETRANSMISSION))
+        return drop
+
+    @staticmethod
+    def start_backoff(engine, nodes: np.ndarray, next_state: np.ndarray):
+        """
+        Binary exponential backoff on the attempt count of the message at the head of the queue.
+        """
+        head_attempts = engine.queue_attempt[nodes, engine.queue_head[nodes]]
+        for node, attempt_count in zip(nodes, head_attempts):
+            engine.wait_time[node] = engine.random_exponential_backoff(node, attempt_count)
+        next_state[nodes] = WAIT
+
+    @staticmethod
+    def count_down_backoff(engine, nodes: np.ndarray, next_state: np.ndarray):
+        engine.wait_time[nodes] -= 1
+        next_state[nodes[engine.wait_time[nodes] <= 0]] = READY_TO_TRANSMIT
+
+
+class CsmaCdProtocol(MacProtocol):
+    """
+    1-persistent CSMA with collision detection, the FSM of ActorState.progress_actorstate_time: send as soon as the
+    channel is free, on a collision cut the message off, jam and retry after a binary exponential backoff.
+    """
+
+    def step(self, engine, busy: np.ndarray):
+        state = engine.state
+        next_state = state.copy()
+        queued = engine.queue_count > 0
+
+        next_state[(state == IDLE) & queued] = READY_TO_TRANSMIT
+
+        # Evaluate every branch against the state at the start of the step before mutating anything
+        ready = np.flatnonzero((state == READY_TO_TRANSMIT) & ~busy)
+        transmitting = np.flatnonzero(state == TRANSMITTING)
+        jamming = np.flatnonzero(state == JAMMING)
+        waiting = np.flatnonzero(state == WAIT)
+
+        if len(ready) > 0:
+            self.start_transmissions(engine, ready, next_state)
+
+        if len(transmitting) > 0:
+            slots = engine.current_slot[transmitting]
+            distance = engine.wave_distance[transmitting, slots]
+            still_transmitting = distance < engine.wave_length[transmitting, slots]
+
+            done = transmitting[~still_transmitting]
+            if len(done) > 0:
+                self.finish_transmissions(engine, done, queued, next_state)
+
+            collided_mask = still_transmitting & busy[transmitting]
+            collided = transmitting[collided_mask]
+            if len(collided) > 0:
+                count = len(collided)
+                slots = slots[collided_mask]
+                engine.num_collisions[collided] += 1
+                engine.cut_off(collided, slots)
+                engine.drop_message[collided] = self.queue_retransmissions(engine, collided, slots)
+                engine.current_slot[collided] = engine.emit(collided, engine.new_packet_ids(count),
+                                                            np.zeros(count, dtype=np.int64),
+                                                            np.ones(count, dtype=np.int64),
+                                                            np.full(count, engine.time), np.full(count, TYPE_JAMMING),
+                                                            engine.jamming_packet_length)
+                next_state[collided] = JAMMING
+
+        if len(jamming) > 0:
+            slots = engine.current_slot[jamming]
+            done = jamming[~(engine.wave_distance[jamming, slots] < engine.wave_length[jamming, slots])]
+            dropping = engine.drop_message[done]
+            dropped = done[dropping]
+            backoff = done[~dropping]
+            if len(dropped) > 0:
+                engine.num_dropped_messages[dropped] += 1
+                engine.drop_message[dropped] = False
+                next_state[dropped] = np.where(queued[dropped], READY_TO_TRANSMIT, IDLE)
+            if len(backoff) > 0:
+                self.start_backoff(engine, backoff, next_state)
+
+        if len(waiting) > 0:
+            self.count_down_backoff(engine, waiting, next_state)
+
+        engine.state = next_state
+
+
+class AlohaProtocol(MacProtocol):
+    """
+    Pure ALOHA: a queued message is sent right away, without carrier sense, and always sent out completely.
+    The transmitter notes whether anything was sensed while sending (the collision information CSMA/CD acts on
+    immediately); a collided message is retried after a binary exponential backoff, or dropped after max_attempts.
+    """
+
+    def may_transmit(self, engine, ready: np.ndarray, busy: np.ndarray) -> np.ndarray:
+        """
+        Which of the READY_TO_TRANSMIT nodes start sending in this step.
+        """
+        return np.ones(len(ready), dtype=bool)
+
+    def step(self, engine, busy: np.ndarray):
+        state = engine.state
+        next_state = state.copy()
+        queued = engine.queue_count > 0
+
+        next_state[(state == IDLE) & queued] = READY_TO_TRANSMIT
+
+        ready = np.flatnonzero(state == READY_TO_TRANSMIT)
+        ready = ready[self.may_transmit(engine, ready, busy)]
+        transmitting = np.flatnonzero(state == TRANSMITTING)
+        waiting = np.flatnonzero(state == WAIT)
+
+        if len(ready) > 0:
+            self.start_transmissions(engine, ready, next_state)
+            engine.collision_seen[ready] = busy[ready]
+
+        if len(transmitting) > 0:
+            slots = engine.current_slot[transmitting]
+            still_transmitting = engine.wave_distance[transmitting, slots] < engine.wave_length[transmitting, slots]
+            sending = transmitting[still_transmitting]
+            engine.collision_seen[sending] |= busy[sending]
+
+            done = transmitting[~still_transmitting]
+            collided_mask = engine.collision_seen[done]
+            delivered = done[~collided_mask]
+            if len(delivered) > 0:
+                self.finish_transmissions(engine, delivered, queued, next_state)
+
+            collided = done[collided_mask]
+            if len(collided) > 0:
+                engine.num_collisions[collided] += 1
+                engine.collision_seen[collided] = False
+                drop = self.queue_retransmissions(engine, collided, engine.current_slot[collided])
+                dropped = collided[drop]
+                if len(dropped) > 0:
+                    engine.num_dropped_messages[dropped] += 1
+                    next_state[dropped] = np.where(queued[dropped], READY_TO_TRANSMIT, IDLE)
+                if np.any(~drop):
+                    self.start_backoff(engine, collided[~drop], next_state)
+
+        if len(waiting) > 0:
+            self.count_down_backoff(engine, waiting, next_state)
+
+        engine.state = next_state
+
+
+class SlottedAlohaProtocol(AlohaProtocol):
+    """
+    Slotted ALOHA: as pure ALOHA, but transmissions only start at the first time index of a slot.
+    The slot defaults to the time a data message takes to leave the antenna.
+    """
+
+    def __init__(self, slot_steps: int = None):
+        assert slot_steps is None or slot_steps > 0
+        self.slot_steps = slot_steps
+
+    def may_transmit(self, engine, ready: np.ndarray, busy: np.ndarray) -> np.ndarray:
+        slot_steps = self.slot_steps
+        if slot_steps is None:
+            slot_steps = max(1, math.ceil(engine.data_packet_length / (engine.time_step * engine.wave_velocity)))
+        return np.full(len(ready), engine.time_index % slot_steps == 0)
+
+
+class PPersistentCsmaProtocol(AlohaProtocol):
+    """
+    p-persistent CSMA without collision detection: a node with a queued message senses the channel every step and,
+    once it is free, sends with probability 'persistence' (defers to the next step otherwise). Messages are sent out
+    completely and collisions are handled as in pure ALOHA.
+    """
+
+    def __init__(self, persistence: float = 0.5):
+        assert 0.0 < persistence <= 1.0
+        self.persistence = persistence
+
+    def may_transmit(self, engine, ready: np.ndarray, busy: np.ndarray) -> np.ndarray:
+        free = ~busy[ready]
+        transmit = np.zeros(len(ready), dtype=bool)
+        transmit[free] = engine.random_uniform(ready[free]) < self.persistence
+        return transmit
@@ -1,7 +1,7 @@
-from enum import Enum
+from enum import IntEnum
 
 
-class MacState(Enum):
+class MacState(IntEnum):
     IDLE = 0
     READY_TO_TRANSMIT = 2
     TRANSMITTING = 3
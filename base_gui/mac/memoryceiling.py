@@ -0,0 +1,43 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class MemoryCeiling(object):
+    """
+    Global memory budget of an oracle run. The resident set size of the process is looked up at most every
+    'check_interval' time steps; once it is above 'max_bytes' the engines stop and keep the steps simulated so far.
+    """
+
+    def __init__(self, max_bytes: int, check_interval: int = 100):
+        assert max_bytes > 0 and check_interval > 0
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self.next_check_index = check_interval
+
+    @staticmethod
+    def resident_bytes() -> int:
+        """
+        Current resident set size from /proc. Where /proc is not available this falls back to the peak resident size
+        of the process so far (ru_maxrss, in bytes on macOS and in kilobytes elsewhere), not its current size.
+        0 if neither is known.
+        """
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            pass
+        if resource is not None:
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == 'darwin' else max_rss * 1024
+        return 0
+
+    def exceeded(self, time_index: int) -> bool:
+        if time_index < self.next_check_index:
+            return False
+        self.next_check_index = time_index + self.check_interval
+        return self.resident_bytes() > self.max_bytes
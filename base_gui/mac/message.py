@@ -1,10 +1,10 @@
-import uuid
-from typing import Any
+import math
+from typing import Tuple, Optional
 
 import attr
 import numpy as np
 
-from base_gui.constants import SimConsts
+from base_gui.mac.simconsts import SimConsts
 from base_gui.mac.messagetype import MessageType
 
 
@@ -16,11 +16,11 @@ class ImmutableMessage(object):
     prop_packet_length: float = attr.attrib()
     origin_position: np.ndarray
     # Any metadata required for proper functioning of the MAC layer. For example: RTS/CTS+data length window
-    packet_id: uuid.UUID
+    packet_id: int
     max_range: float
     type: MessageType
     prop_distance: float
-    retransmission_parent: uuid.UUID
+    retransmission_parent: int
     attempt_count: int
     original_start_time: int
 
@@ -29,19 +29,35 @@ class Message(object):
     """
     A multi-functional data object tied to the transmitting actor, moment transmission and a propagation distance.
     Conclusion: it can be visualized as a donut wave-front, whilst also carrying MAC-layer metadata.
+    Messages are recycled through a MessagePool, hence the slots and the separate reset().
     """
+    __slots__ = ('prop_packet_length', 'packet_id', 'max_range', 'type', 'origin_position', 'prop_distance',
+                 'retransmission_parent', 'attempt_count', 'original_start_time', 'wave_velocity', 'emission_index',
+                 'emission_neighbours', 'emission_distances', 'immutable_message')
 
     def __init__(self,
                  type: MessageType,
                  prop_packet_length: float,
                  origin: np.ndarray,
-                 packet_id: Any,
+                 packet_id: int,
                  max_range: float,
-                 retransmission_parent: Any,
+                 retransmission_parent: int,
                  attempt_count: int,
                  original_start_time: int,
                  wave_velocity=SimConsts.WAVE_VELOCITY):
-
+        self.reset(type, prop_packet_length, origin, packet_id, max_range, retransmission_parent, attempt_count,
+                   original_start_time, wave_velocity)
+
+    def reset(self,
+              type: MessageType,
+              prop_packet_length: float,
+              origin: np.ndarray,
+              packet_id: int,
+              max_range: float,
+              retransmission_parent: int,
+              attempt_count: int,
+              original_start_time: int,
+              wave_velocity=SimConsts.WAVE_VELOCITY):
         # Propagation time converted to travel length (relatable to frame length)
         assert prop_packet_length > 0.0
         self.prop_packet_length: float = prop_packet_length
@@ -56,22 +72,31 @@ class Message(object):
         self.original_start_time = original_start_time
 
         self.wave_velocity = wave_velocity
+        self.emission_index = 0  # Time index at which the message was put on the antenna
+        # Neighbour states and distances of the transmitter at that moment, the receivers of its arrival intervals
+        self.emission_neighbours = None
+        self.emission_distances = None
+        # Snapshot shared by every freeze until the wave moves or changes length
+        self.immutable_message: Optional[ImmutableMessage] = None
 
     def message_travel(self, delta_distance):
         self.prop_distance += delta_distance
+        self.immutable_message = None
 
     def get_immutable_message(self):
-        return ImmutableMessage(
-            self.prop_packet_length,
-            self.origin_position,
-            self.packet_id,
-            self.max_range,
-            self.type,
-            self.prop_distance,
-            self.retransmission_parent,
-            self.attempt_count,
-            self.original_start_time
-        )
+        if self.immutable_message is None:
+            self.immutable_message = ImmutableMessage(
+                self.prop_packet_length,
+                self.origin_position,
+                self.packet_id,
+                self.max_range,
+                self.type,
+                self.prop_distance,
+                self.retransmission_parent,
+                self.attempt_count,
+                self.original_start_time
+            )
+        return self.immutable_message
 
     def get_distance_travelled(self):
         return self.prop_distance
@@ -81,7 +106,12 @@ class Message(object):
         Calculate whether head of wave + propagation length is beyond a receiving actor.
         If so: could trigger RX scenario, if not received already by that actor.
         """
-        txrx_dist = np.linalg.norm(actor_position - self.origin_position)
+        return self.check_tail_beyond_distance(np.linalg.norm(actor_position - self.origin_position))
+
+    def check_tail_beyond_distance(self, txrx_dist: float):
+        """
+        check_tail_beyond_receiver for a receiver at a known (precomputed) distance from the origin.
+        """
         return self.prop_distance > txrx_dist + self.prop_packet_length
 
     def check_message_transmitting(self):
@@ -95,9 +125,26 @@ class Message(object):
         Check if message is 'entering a receiver' (but has not moved beyond)
         Note: handy as carrier check.
         """
-        txrx_dist = np.linalg.norm(actor_position - self.origin_position)
+        return self.check_message_arriving_distance(np.linalg.norm(actor_position - self.origin_position))
+
+    def check_message_arriving_distance(self, txrx_dist: float):
+        """
+        check_message_arriving for a receiver at a known (precomputed) distance from the origin.
+        """
         return not self.prop_distance > txrx_dist + self.prop_packet_length and self.prop_distance > txrx_dist
 
+    def arrival_interval(self, txrx_dist: float, delta_time_step) -> Tuple[int, int]:
+        """
+        Time indices [start, end) at which check_message_arriving_distance holds for a receiver at txrx_dist,
+        given the current packet length. Empty if the wave is clipped at max range before reaching the receiver.
+        """
+        if not txrx_dist < self.max_range:
+            return self.emission_index, self.emission_index
+        delta_distance = delta_time_step * self.wave_velocity
+        start = self.emission_index + math.floor(txrx_dist / delta_distance) + 1
+        end = self.emission_index + math.floor((txrx_dist + self.prop_packet_length) / delta_distance) + 1
+        return start, end
+
     def check_message_done(self):
         """
         Check if message has travelled beyond furthest point (max range)
@@ -106,13 +153,15 @@ class Message(object):
 
     def cut_off_message(self):
         """
-        Stop transmitting new parts of the message, reducing the length to what was already in the air
+        Stop transmitting new parts of the message, reducing the length to what was already in the air.
+        Only called for the message on the antenna (see check_message_transmitting), checked runs verify it per step.
         """
-        assert self.check_message_transmitting()
         self.prop_packet_length = self.prop_distance
+        self.immutable_message = None
 
     def propagate(self, delta_time_step) -> int:
         self.prop_distance += delta_time_step * self.wave_velocity
+        self.immutable_message = None
 
         if self.check_message_done():
             overshot = self.prop_distance - self.max_range
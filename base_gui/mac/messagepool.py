@@ -0,0 +1,56 @@
+from typing import List
+
+import numpy as np
+
+from base_gui.mac.simconsts import SimConsts
+from base_gui.mac.message import Message
+from base_gui.mac.messagetype import MessageType
+
+
+class MessagePool(object):
+    """
+    Source of Message objects for all actors of one simulation run.
+    Packet ids are monotonically increasing integers (0 is reserved for 'no retransmission parent') and messages that
+    left the air are recycled from a free list instead of being garbage collected.
+    Pools of separately simulated parts of one network hand out interleaved ids ('first_packet_id' + k * 'stride'),
+    so ids stay unique after stitching the parts back together.
+    """
+
+    def __init__(self, first_packet_id: int = 1, packet_id_stride: int = 1):
+        assert first_packet_id > 0 and packet_id_stride > 0
+        self.next_packet_id = first_packet_id
+        self.packet_id_stride = packet_id_stride
+        self.free_messages: List[Message] = list()
+
+    def new_packet_ids(self, count: int) -> np.ndarray:
+        """
+        Reserve 'count' consecutive packet ids, for engines that do not use Message objects.
+        """
+        ids = self.next_packet_id + self.packet_id_stride * np.arange(count, dtype=np.int64)
+        self.next_packet_id += self.packet_id_stride * count
+        return ids
+
+    def acquire(self,
+                type: MessageType,
+                prop_packet_length: float,
+                origin: np.ndarray,
+                max_range: float,
+                retransmission_parent: int,
+                attempt_count: int,
+                original_start_time: int,
+                wave_velocity=SimConsts.WAVE_VELOCITY) -> Message:
+        packet_id = self.next_packet_id
+        self.next_packet_id += self.packet_id_stride
+        if len(self.free_messages) > 0:
+            message = self.free_messages.pop()
+            message.reset(type, prop_packet_length, origin, packet_id, max_range, retransmission_parent,
+                          attempt_count, original_start_time, wave_velocity)
+            return message
+        return Message(type, prop_packet_length, origin, packet_id, max_range, retransmission_parent, attempt_count,
+                       original_start_time, wave_velocity)
+
+    def release(self, message: Message):
+        """
+        Hand back a message nobody refers to anymore (purged from the air).
+        """
+        self.free_messages.append(message)
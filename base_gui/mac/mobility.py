@@ -0,0 +1,92 @@
+import numpy as np
+
+from base_gui.mac.neighbourtable import NeighbourTable
+from base_gui.mac.spatialgrid import SpatialGrid
+
+
+class RandomWalkMobility(object):
+    """
+    Every 'move_interval' time steps each node moves by a uniform random displacement of at most 'max_displacement'
+    meters per axis, the MAC counterpart of GraphGenerator.get_nodes_step.
+    Displacements are drawn from 'generator', the module-level numpy generator if None.
+    """
+
+    def __init__(self, max_displacement: float, move_interval: int = 1, generator: np.random.Generator = None):
+        assert max_displacement >= 0.0 and move_interval > 0
+        self.max_displacement = max_displacement
+        self.move_interval = move_interval
+        self.generator = generator
+
+    def moves_at(self, time_index: int) -> bool:
+        return time_index > 0 and time_index % self.move_interval == 0
+
+    def next_positions(self, positions: np.ndarray) -> np.ndarray:
+        """
+        New positions as a new array, arrays handed out before are never changed (messages keep their origin).
+        """
+        generator = self.generator if self.generator is not None else np.random
+        return positions + generator.uniform(-self.max_displacement, self.max_displacement, positions.shape)
+
+
+class MobileNeighbourIndex(object):
+    """
+    Neighbour table of moving nodes, maintained incrementally on a SpatialGrid.
+    The grid looks up candidate pairs within the transmission range plus a margin ('skin'), sorted by receiver and
+    transmitter. While no node moved more than half the margin away from where the candidates were looked up, no pair
+    outside them can have come within range: a move only re-measures the candidates with a moved end and keeps those
+    in range, which leaves the CSR rows in order without sorting. The grid is queried again once a node went further.
+    """
+    SKIN_FRACTION = 0.25
+
+    def __init__(self, neighbour_table: NeighbourTable, positions: np.ndarray, transmission_range: float):
+        self.transmission_range = transmission_range
+        self.skin = self.SKIN_FRACTION * transmission_range
+        self.grid = SpatialGrid(positions, transmission_range + self.skin)
+        self.neighbour_table = neighbour_table
+        self.num_cell_changes = 0
+        self.num_links_evaluated = 0
+        self.num_candidate_queries = 0
+        self.__query_candidates(positions)
+
+    def __query_candidates(self, positions: np.ndarray):
+        self.anchor_positions = positions
+        self.candidate_rx, self.candidate_tx, self.candidate_distances = \
+            self.grid.query_pairs(self.transmission_range + self.skin)
+        self.num_candidate_queries += 1
+        self.num_links_evaluated += len(self.candidate_rx)
+
+    def move(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Move the nodes to 'positions' and update 'neighbour_table'.
+        Returns the nodes whose neighbours or neighbour distances may have changed, ascending.
+        """
+        old_table = self.neighbour_table
+        moved = np.flatnonzero(np.any(positions != self.grid.positions, axis=1))
+        self.num_cell_changes += len(self.grid.move(moved, positions))
+        if len(moved) == 0:
+            return moved
+        is_moved = np.zeros(len(positions), dtype=bool)
+        is_moved[moved] = True
+
+        displacement = np.linalg.norm(positions - self.anchor_positions, axis=1)
+        requeried = 2.0 * displacement.max() >= self.skin
+        if requeried:
+            self.__query_candidates(positions)
+        else:
+            touched = np.flatnonzero(is_moved[self.candidate_rx] | is_moved[self.candidate_tx])
+            was_linked = self.candidate_distances[touched] < self.transmission_range
+            distances = np.linalg.norm(positions[self.candidate_rx[touched]] - positions[self.candidate_tx[touched]],
+                                       axis=1)
+            self.candidate_distances[touched] = distances
+            self.num_links_evaluated += len(touched)
+            # Links are symmetric, so the receivers of the links of moved nodes, before or after, are all affected
+            affected = self.candidate_rx[touched[was_linked | (distances < self.transmission_range)]]
+
+        linked = self.candidate_distances < self.transmission_range
+        link_rx, link_tx = self.candidate_rx[linked], self.candidate_tx[linked]
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(link_rx, minlength=len(positions)))
+        self.neighbour_table = NeighbourTable(offsets, link_tx, self.candidate_distances[linked])
+        if requeried:
+            affected = np.concatenate((old_table.receivers[is_moved[old_table.indices]], link_rx[is_moved[link_tx]]))
+        return np.unique(np.concatenate((moved, affected)))
@@ -0,0 +1,97 @@
+from typing import Tuple
+
+import numpy as np
+
+from base_gui.mac.spatialgrid import SpatialGrid
+
+
+class NeighbourTable(object):
+    """
+    CSR-style neighbour geometry, built once per topology.
+    The neighbours of node i are indices[offsets[i]:offsets[i + 1]] (ascending) at the matching entries of distances.
+    """
+
+    def __init__(self, offsets: np.ndarray, indices: np.ndarray, distances: np.ndarray):
+        self.offsets = offsets
+        self.indices = indices
+        self.distances = distances
+
+    @staticmethod
+    def from_positions(positions: np.ndarray, transmission_range: float) -> 'NeighbourTable':
+        receivers, transmitters, distances = SpatialGrid(positions, transmission_range).query_pairs(transmission_range)
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(receivers, minlength=len(positions)))
+        return NeighbourTable(offsets, transmitters, distances)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_links(self) -> int:
+        return len(self.indices)
+
+    @property
+    def receivers(self) -> np.ndarray:
+        """
+        Receiving node of every directed link, the row index expanded to the length of 'indices'.
+        """
+        return np.repeat(np.arange(self.num_nodes), np.diff(self.offsets))
+
+    def neighbours(self, node: int) -> np.ndarray:
+        return self.indices[self.offsets[node]:self.offsets[node + 1]]
+
+    def neighbour_distances(self, node: int) -> np.ndarray:
+        return self.distances[self.offsets[node]:self.offsets[node + 1]]
+
+    def connected_components(self) -> Tuple[int, np.ndarray]:
+        """
+        Label the connected components of the neighbour graph by hooking the larger of two linked roots onto the
+        smaller one and shortcutting root pointers until no link crosses two components.
+        Returns the number of components and per node its component, numbered in order of the lowest node index.
+        """
+        labels = np.arange(self.num_nodes)
+        receivers = self.receivers
+        while True:
+            receiver_labels = labels[receivers]
+            transmitter_labels = labels[self.indices]
+            crossing = receiver_labels != transmitter_labels
+            if not np.any(crossing):
+                break
+            np.minimum.at(labels, np.maximum(receiver_labels, transmitter_labels)[crossing],
+                          np.minimum(receiver_labels, transmitter_labels)[crossing])
+            while True:
+                parents = labels[labels]
+                if np.array_equal(parents, labels):
+                    break
+                labels = parents
+        roots, components = np.unique(labels, return_inverse=True)
+        return len(roots), components
+
+    def subgraph(self, nodes: np.ndarray) -> 'NeighbourTable':
+        """
+        Table of 'nodes', each renumbered to its position in 'nodes'. Rows keep the neighbour order of this table and
+        links to nodes outside the set are dropped.
+        """
+        local_index = np.full(self.num_nodes, -1, dtype=np.int64)
+        local_index[nodes] = np.arange(len(nodes))
+        counts = self.offsets[nodes + 1] - self.offsets[nodes]
+        links = np.repeat(self.offsets[nodes], counts) + np.arange(int(counts.sum())) - \
+            np.repeat(np.cumsum(counts) - counts, counts)
+        receivers = np.repeat(np.arange(len(nodes)), counts)
+        transmitters = local_index[self.indices[links]]
+        kept = transmitters >= 0
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(receivers[kept], minlength=len(nodes)))
+        return NeighbourTable(offsets, transmitters[kept], self.distances[links][kept])
+
+    def replicate(self, num_copies: int) -> 'NeighbourTable':
+        """
+        Table of 'num_copies' disjoint copies of this network, copy c holds the nodes from c * num_nodes up to
+        (c + 1) * num_nodes.
+        """
+        copy_offsets = np.arange(num_copies, dtype=np.int64)
+        offsets = np.concatenate(([0], (self.offsets[1:][np.newaxis, :] +
+                                        (copy_offsets * self.num_links)[:, np.newaxis]).ravel()))
+        indices = (self.indices[np.newaxis, :] + (copy_offsets * self.num_nodes)[:, np.newaxis]).ravel()
+        return NeighbourTable(offsets, indices, np.tile(self.distances, num_copies))
@@ -0,0 +1,32 @@
+import numpy as np
+
+
+class NodeRandomStream(object):
+    """
+    Random draws of a single node from its own numpy Generator, seeded with the node seed. Uniform draws are fetched
+    from the generator in batches of 'batch_size', a draw is a list lookup instead of a generator call. Offers the
+    'random' and 'randint' methods of random.Random the engines use, so it stands in for the module-level generator.
+    The draws of a node only depend on its seed, whichever process or engine steps it.
+    """
+    __slots__ = ('generator', 'batch_size', 'batch', 'batch_index')
+
+    def __init__(self, seed: int, batch_size: int = 256):
+        assert batch_size > 0
+        self.generator = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.batch: list = list()
+        self.batch_index = 0
+
+    def random(self) -> float:
+        if self.batch_index == len(self.batch):
+            self.batch = self.generator.random(self.batch_size).tolist()
+            self.batch_index = 0
+        value = self.batch[self.batch_index]
+        self.batch_index += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        """
+        Uniform integer in [a, b], both included.
+        """
+        return a + int(self.random() * (b - a + 1))
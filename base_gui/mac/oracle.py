@@ -1,11 +1,85 @@
-import statistics
-from typing import List
+import copy
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Union, Dict, Iterator, Callable, Any, Tuple
 
+import attr
 import numpy as np
-from pygame import Rect
 
 from base_gui.mac.actorstate import FrozenActorState
 from base_gui.mac.actorstatehistory import ActorStateHistory
+from base_gui.mac.enginesnapshot import EngineSnapshot
+from base_gui.mac.arrivalschedule import ArrivalSource, ArrivalSchedule, ArrivalSubset, ArrivalTrace
+from base_gui.mac.ensembleengine import EnsembleMacEngine
+from base_gui.mac.oracleengine import OracleEngine
+from base_gui.mac.eventengine import EventMacEngine
+from base_gui.mac.historystore import HistoryStore, HistoryRecorder
+from base_gui.mac.invariants import check_neighbour_references, check_actor_states, check_vectorized_engine
+from base_gui.mac.macprotocol import MacProtocol
+from base_gui.mac.memoryceiling import MemoryCeiling
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.mobility import RandomWalkMobility, MobileNeighbourIndex
+from base_gui.mac.neighbourtable import NeighbourTable
+from base_gui.mac.noderandomstream import NodeRandomStream
+from base_gui.mac.queuedroppolicy import QueueDropPolicy
+from base_gui.mac.runcheckpoint import CheckpointWriter, load_checkpoint
+from base_gui.mac.simconsts import SimConsts
+from base_gui.mac.simstatistics import Statistics, EnsembleStatistics, TransmissionTimeHistogram
+from base_gui.mac.steadystate import SteadyStateDetector
+from base_gui.mac.tiledengine import TiledMacEngine
+from base_gui.mac.topologycache import Topology
+from base_gui.mac.vectorizedengine import VectorizedMacEngine
+
+# Connected components are simulated in at most this many groups, each reading the arrivals of the whole run
+COMPONENT_GROUPS = 64
+# Child of the root seed that the arrival seeds of forks descend from, past the children spawned by preprocess
+FORK_SEED_KEY = 2 ** 16
+
+
+@attr.attrs(auto_attribs=True, frozen=True)
+class ComponentTask(object):
+    """
+    Everything a worker process needs to simulate a group of connected components of the neighbour graph on its
+    own. Nodes are renumbered 0..n-1 within the group, in the order of their index in the full network, and the
+    arrivals of the group are filtered from a copy of the arrival source of the run while the group is simulated.
+    """
+    engine: OracleEngine
+    time_steps: int
+    identifiers: List[str]
+    positions: np.ndarray
+    neighbour_table: NeighbourTable
+    node_seeds: np.ndarray
+    arrivals: ArrivalSubset
+    first_packet_id: int
+    packet_id_stride: int
+    protocol: MacProtocol = None
+    queue_limit: int = None
+    queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP
+    checked: bool = False
+
+
+def simulate_component(task: ComponentTask) -> HistoryStore:
+    """
+    Worker entry point: run the engine on a group of components and return its (time_steps, group nodes) history.
+    """
+    oracle = Oracle(len(task.identifiers), 0.0)
+    oracle.report_progress = False
+    oracle.node_positions_np = task.positions
+    oracle.message_pool = MessagePool(task.first_packet_id, task.packet_id_stride)
+    for identifier, position, node_seed in zip(task.identifiers, task.positions, task.node_seeds.tolist()):
+        oracle.actors.append(ActorStateHistory(identifier, position, message_pool=oracle.message_pool,
+                                               rng=NodeRandomStream(node_seed)))
+    oracle.neighbour_table = task.neighbour_table
+    oracle.node_seeds = task.node_seeds
+    oracle.protocol = task.protocol
+    oracle.queue_limit = task.queue_limit
+    oracle.queue_drop_policy = task.queue_drop_policy
+    oracle.checked = task.checked
+    oracle.time_steps = task.time_steps
+    oracle.arrival_schedule = task.arrivals
+    oracle.run_engine(task.engine)
+    return oracle.sim_history
 
 
 class Oracle(object):
@@ -15,9 +89,45 @@ class Oracle(object):
         self.current_time = 0
         self.num_nodes = num_nodes
         self.positional_spread = positional_spread
+        self.report_progress = True
+        # Per node seeds of the backoff generators, None if all nodes draw from the shared module-level generator
+        self.node_seeds = None
+        # Root of the seeds of a seeded run, forks derive the seed of their arrivals from it
+        self.root_seed: np.random.SeedSequence = None
+        # MAC kernel of the vectorized engines, CSMA/CD if None
+        self.protocol: MacProtocol = None
+        # Node movement, None for static nodes; positions of every time step are kept in 'position_history'
+        self.mobility: RandomWalkMobility = None
+        self.position_history: np.ndarray = None
+        # Queue bound of every node, unbounded if None
+        self.queue_limit: int = None
+        self.queue_drop_policy = QueueDropPolicy.TAIL_DROP
+        # Stops the run early once the process uses too much memory, 'truncated' tells whether it did
+        self.memory_ceiling: MemoryCeiling = None
+        self.truncated = False
+        # Stops the run early once the network rates have settled, see SteadyStateDetector
+        self.steady_state: SteadyStateDetector = None
+        # Without history only the final states of the nodes are kept, 'sim_history' is None
+        self.keep_history = True
+        self.final_states: List[FrozenActorState] = list()
+        self.steps_simulated = 0
+        # Verify the engine invariants after every step, see invariants; fast runs skip every check
+        self.checked = False
+        # (engine, workers, tiles) of the run prepared by preprocess, until it is started
+        self.run_plan: tuple = None
+
+        # Cached positions and neighbour table the actors were created from, if any (see load_topology)
+        self.topology: Topology = None
+        # Engine snapshots by time index, taken every 'snapshot_interval' steps to fork runs from (see snapshot)
+        self.snapshot_interval: int = None
+        self.checkpoints: Dict[int, EngineSnapshot] = dict()
+        # Leading rows of the history of the run this one was forked from, shared with that run
+        self.shared_history: HistoryStore = None
+        # Writes checkpoints to disk while running, see resume
+        self.checkpoint_writer: CheckpointWriter = None
 
-        self.timenode_istransmitting_poisson: np.ndarray  # dtype=ActorState
-        self.sim_history: np.ndarray
+        self.arrival_schedule: ArrivalSource
+        self.sim_history: HistoryStore
 
     @staticmethod
     def __generate_positions(num_nodes: int, cov_diag: float):
@@ -25,23 +135,98 @@ class Oracle(object):
         cov = [[cov_diag, 0], [0, cov_diag]]  # Spherical distribution
         return np.random.multivariate_normal(mean, cov, num_nodes, check_valid='raise')
 
-    @staticmethod
-    def __calc_actor_distances(actor1: ActorStateHistory, actor2: ActorStateHistory):
-        return np.linalg.norm(actor1.position - actor2.position)
-
     def generate_actors(self):
         self.actors = list()
+        self.message_pool = MessagePool()
         self.node_positions_np = self.__generate_positions(self.num_nodes, self.positional_spread)
         for i, position in enumerate(self.node_positions_np):
             identifier = "N{}".format(i)
-            self.actors.append(ActorStateHistory(identifier, position))
+            self.actors.append(ActorStateHistory(identifier, position, message_pool=self.message_pool))
+        self.topology = None
+
+    def load_topology(self, topology: Topology):
+        """
+        Create fresh actors on the positions of a cached topology. preprocess then re-uses its neighbour table when
+        run with the same transmission range, instead of determining the neighbours again.
+        """
+        assert len(topology.positions) == self.num_nodes
+        self.actors = list()
+        self.message_pool = MessagePool()
+        self.node_positions_np = topology.positions
+        for i, position in enumerate(self.node_positions_np):
+            identifier = "N{}".format(i)
+            self.actors.append(ActorStateHistory(identifier, position, message_pool=self.message_pool))
+        self.topology = topology
+
+    def __determine_neighbours(self, transmission_range: float):
+        topology = self.topology
+        if topology is not None and topology.positions is self.node_positions_np and \
+                topology.transmission_range == transmission_range:
+            self.__report("Pre-processing guiSimMac - re-using cached node neighbours")
+            self.neighbour_table = topology.neighbour_table
+        else:
+            self.__report("Pre-processing guiSimMac - determining node neighbours")
+            self.neighbour_table = NeighbourTable.from_positions(self.node_positions_np, transmission_range)
 
     def preprocess(self,
                    time_steps: int,
                    delta_time: int,
                    transmission_chance: float,
                    transmission_range: float, packet_length: int,
-                   regenerate_positions: bool = False):
+                   regenerate_positions: bool = False,
+                   engine: OracleEngine = OracleEngine.OBJECT,
+                   seed: int = None,
+                   workers: int = None,
+                   tiles: int = None,
+                   protocol: MacProtocol = None,
+                   mobility: RandomWalkMobility = None,
+                   queue_limit: int = None,
+                   queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP,
+                   memory_limit: int = None,
+                   arrival_trace: Union[str, List[str]] = None,
+                   snapshot_interval: int = None,
+                   checkpoint_dir: str = None,
+                   checkpoint_interval: int = 1000,
+                   steady_state_tolerance: float = None,
+                   warmup_steps: int = 0,
+                   keep_history: bool = True,
+                   checked: bool = False,
+                   run: bool = True):
+        """
+        Simulate 'time_steps' steps and store the states of all nodes in 'sim_history'.
+        'seed' gives every node its own backoff stream (see NodeRandomStream) and the arrivals their own generator,
+        all derived from this root seed, so a seeded run does not depend on the module-level generators.
+        'workers' simulates the connected components of the neighbour graph separately, in that many worker processes
+        (in process for 1). Nodes only interact within a component, so with the same seeds the result does not depend
+        on the number of workers. A root seed is drawn if none is given. The components are simulated in up to
+        COMPONENT_GROUPS groups, each filtering its arrivals from the chunks of its own copy of the arrival source, so
+        arrivals are streamed as in a single process.
+        'tiles' splits the plane into that many tiles instead, each simulated by its own worker process in lock step
+        with the others (object engine only). This spreads a single connected network over several cores.
+        'protocol' replaces the CSMA/CD kernel of the vectorized engine (see macprotocol).
+        'mobility' moves the nodes between time steps (object engine only). A message reaches the neighbours of its
+        transmitter at the moment it was put on the antenna, at the distances of that moment. A seeded run gives the
+        mobility model its own generator, derived from 'seed'.
+        'queue_limit' bounds the number of messages queued at a node; an arrival at a full queue is dropped, or the
+        oldest queued message is dropped for it, according to 'queue_drop_policy'. Either counts as a queue drop.
+        'memory_limit' (bytes) stops the simulation early once the resident size of the process exceeds it, keeping
+        the steps simulated so far: 'truncated' is set and 'time_steps' holds the number of steps kept.
+        'arrival_trace' replays the arrivals of one or more trace files (see ArrivalTrace, times in units of
+        'delta_time') instead of drawing them with 'transmission_chance'. The files are streamed chunk by chunk.
+        'snapshot_interval' keeps an engine snapshot before the first step and after every that many steps (only the
+        first for the event engine), so 'snapshot' can restore any step and 'fork' can continue from it.
+        'checkpoint_dir' writes a checkpoint of the engine and the history so far to that directory every
+        'checkpoint_interval' steps (object and vectorized engine in process), see resume.
+        'steady_state_tolerance' stops the simulation once the rates of successful transmissions, collisions and drops
+        per step are known within that relative tolerance, ignoring the first 'warmup_steps' steps (object and
+        vectorized engine in process). 'steady_state' holds the estimates and 'time_steps' the number of steps kept.
+        'keep_history' False only keeps the counters: no states are recorded per step, 'sim_history' is None and the
+        final states of the nodes are in 'final_states', with transmission time histograms instead of lists (object
+        and vectorized engine in process, without snapshots or checkpoints). Memory does not grow with 'time_steps'.
+        'checked' verifies the neighbour lists and, after every step, the engine invariants such as conservation of
+        messages (object and vectorized engine; the event engine only at the end), raising InvariantError.
+        'run' False only prepares the run, iter_steps then simulates it step by step.
+        """
         self.transmission_chance = transmission_chance
         self.actor_range = transmission_range
         # Create empty actors
@@ -54,80 +239,170 @@ class Oracle(object):
             print("Pre-processing guiSimMac - generating simulation actors")
             self.generate_actors()
 
-        # - calculate neighbours to nodes based on transmission range cutoff
-        # - set IDLE state to each node
-        print("Pre-processing guiSimMac - determining node neighbours")
-        for i, actor in enumerate(self.actors):
-            copy_actors = [x for i2, x in enumerate(self.actors) if i != i2]
-            for neighbour_actor in copy_actors:
-                dist = self.__calc_actor_distances(actor, neighbour_actor)
-                if dist < transmission_range:
-                    actor.add_neighbour(neighbour_actor.state)
-                    neighbour_actor.add_neighbour(actor.state)
-
-        print("Pre-processing guiSimMac - performing node neighbour sanity checks")
-        check_actor = self.actors[0]
-        for neighbour_actor_state in check_actor.state.neighbour_states:
-            state_found = False
-            for neighbour in self.actors:
-                if neighbour_actor_state is neighbour.state:
-                    state_found = True
-            if state_found is False:
-                raise Exception("Neighbour {} state in actor's list of neighbours was dereferenced.".format(
-                    neighbour_actor_state.identifier))
+        # - calculate neighbours and their distances once, shared by every carrier sense check
+        self.__determine_neighbours(transmission_range)
+
+        # - give every node its own backoff stream, required when components are simulated apart
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1, got {}".format(workers))
+        if workers is not None and tiles is not None:
+            raise ValueError("workers and tiles can not be combined")
+        if tiles is not None and tiles < 1:
+            raise ValueError("tiles must be at least 1, got {}".format(tiles))
+        if tiles is not None and engine is not OracleEngine.OBJECT:
+            raise ValueError("tiles needs the object engine, not {}".format(engine.name))
+        if protocol is not None and engine is not OracleEngine.VECTORIZED:
+            raise ValueError("protocol needs the vectorized engine, not {}".format(engine.name))
+        if mobility is not None and engine is not OracleEngine.OBJECT:
+            raise ValueError("mobility needs the object engine, not {}".format(engine.name))
+        if mobility is not None and (workers is not None or tiles is not None):
+            raise ValueError("mobility can not be combined with workers or tiles")
+        if memory_limit is not None and (workers is not None or tiles is not None):
+            raise ValueError("memory_limit can not be combined with workers or tiles")
+        if snapshot_interval is not None and snapshot_interval < 1:
+            raise ValueError("snapshot_interval must be at least 1, got {}".format(snapshot_interval))
+        if snapshot_interval is not None and (workers is not None or tiles is not None or mobility is not None):
+            raise ValueError("snapshot_interval can not be combined with workers, tiles or mobility")
+        if checkpoint_dir is not None and engine is OracleEngine.EVENT:
+            raise ValueError("checkpoint_dir needs the object or vectorized engine, not EVENT")
+        if checkpoint_dir is not None and (workers is not None or tiles is not None or mobility is not None):
+            raise ValueError("checkpoint_dir can not be combined with workers, tiles or mobility")
+        if steady_state_tolerance is not None and engine is OracleEngine.EVENT:
+            raise ValueError("steady_state_tolerance needs the object or vectorized engine, not EVENT")
+        if steady_state_tolerance is not None and (workers is not None or tiles is not None):
+            raise ValueError("steady_state_tolerance can not be combined with workers or tiles")
+        if not keep_history and engine is OracleEngine.EVENT:
+            raise ValueError("keep_history False needs the object or vectorized engine, not EVENT")
+        if not keep_history and (workers is not None or tiles is not None or snapshot_interval is not None or
+                                 checkpoint_dir is not None):
+            raise ValueError("keep_history False can not be combined with workers, tiles, snapshot_interval or "
+                             "checkpoint_dir")
+        self.protocol = protocol
+        self.mobility = mobility
+        self.queue_limit = queue_limit
+        self.queue_drop_policy = queue_drop_policy
+        self.memory_ceiling = MemoryCeiling(memory_limit) if memory_limit is not None else None
+        self.truncated = False
+        self.steady_state = SteadyStateDetector(warmup_steps, steady_state_tolerance) \
+            if steady_state_tolerance is not None else None
+        self.keep_history = keep_history
+        self.checked = checked
+        self.position_history = None
+        if not keep_history:
+            for actor in self.actors:
+                actor.state.transmission_times = TransmissionTimeHistogram()
+        self.snapshot_interval = snapshot_interval
+        self.checkpoints = dict()
+        self.shared_history = None
+        self.checkpoint_writer = CheckpointWriter(checkpoint_dir, checkpoint_interval) if checkpoint_dir else None
+        if seed is None and (workers is not None or tiles is not None):
+            seed = int(np.random.randint(2 ** 31))
+        arrival_generator = None
+        self.root_seed = None
+        if seed is not None:
+            self.root_seed = np.random.SeedSequence(seed)
+            self.node_seeds = self.root_seed.generate_state(self.num_nodes)
+            for actor, node_seed in zip(self.actors, self.node_seeds.tolist()):
+                actor.state.rng = NodeRandomStream(node_seed)
+            arrival_seed, mobility_seed = self.root_seed.spawn(2)
+            arrival_generator = np.random.default_rng(arrival_seed)
+            if mobility is not None:
+                mobility.generator = np.random.default_rng(mobility_seed)
 
         # Init sim
         # - Calculate time division: number of time-sliced atomic events
-        # - Generate random 2D matrix with random binary choice
+        # - Generate sparse random arrivals (Bernoulli per node and time step) or stream them from the trace files,
+        #   consumed chunk by chunk
         self.delta_time = delta_time
         self.time_steps = time_steps
-        self.timenode_istransmitting_random = np.random.choice(
-            [0, 1],
-            (self.time_steps, self.num_nodes),
-            p=[1 - self.transmission_chance, self.transmission_chance])
+        if arrival_trace is not None:
+            self.arrival_schedule = ArrivalTrace(arrival_trace, self.num_nodes, self.time_steps, delta_time)
+        else:
+            self.arrival_schedule = ArrivalSchedule(self.num_nodes, self.time_steps, self.transmission_chance,
+                                                    generator=arrival_generator)
 
         # Simulate each timestep
         # - Increment time (by delta)
-        print("Processing guiSimMac - time steps")
-        for time_index in range(0, self.time_steps):
-            if (time_index % 100) == 0:
-                print("Ran time index {} out of {} time steps".format(time_index, self.time_steps))
-            # print("time {}".format(self.delta_time * time_index))
-            # 1) propagate waves
-            for actor in self.actors:
-                actor.prop_messages()
+        self.run_plan = (engine, workers, tiles)
+        if run:
+            for _ in self.__run_steps():
+                pass
+            self.__finish_run()
 
-            # 2) Transform state, flatten list and store list of state of nodes in 2D time-node state matrix
-            # - Update any nodes with outstanding 'arrivals', MAC update and/or 'out-of-range messages'
-            for actor_index, actor in enumerate(self.actors):
-                actor.progress_time(self.timenode_istransmitting_random[time_index][actor_index])
-            # 3) Save state
-            for actor in self.actors:
-                actor.save_state_to_history()
-        # Flatten result
-        self.sim_history = np.empty((self.time_steps, self.num_nodes), dtype=FrozenActorState)
-        for index, actor in enumerate(self.actors):
-            for time_index, time_actorstate in enumerate(actor.history):
-                self.sim_history[time_index][index] = time_actorstate
-        print("Simulation resulted in {} states stored in 'sim_history'".format(self.sim_history.size))
+        # Store (optional)
+        # - store as JSON with parameters
+
+    def iter_steps(self) -> Iterator[Tuple[int, List[FrozenActorState]]]:
+        """
+        Simulate the run prepared by preprocess(run=False), yielding the time index and the states of all nodes as
+        soon as each step is simulated. 'sim_history' (if kept) and 'statistics' are set once the generator is
+        exhausted. Components, tiles and the event engine simulate the whole run before the first step is yielded.
+        """
+        assert self.run_plan is not None, "preprocess(run=False) first"
+        for time_index, states in self.__run_steps():
+            yield time_index, states()
+        self.__finish_run()
+
+    def __run_steps(self) -> Iterator[Tuple[int, Callable[[], List[FrozenActorState]]]]:
+        # Time index and a function returning the node states of every step, the states are only frozen when asked for
+        engine, workers, tiles = self.run_plan
+        self.run_plan = None
+        if workers is not None:
+            self.__run_components(engine, workers)
+            yield from self.__history_steps()
+        elif tiles is not None:
+            self.__run_tiles(tiles)
+            yield from self.__history_steps()
+        else:
+            yield from self.__engine_steps(engine)
+
+    def __history_steps(self) -> Iterator[Tuple[int, Callable[[], List[FrozenActorState]]]]:
+        for time_index in range(len(self.sim_history)):
+            yield time_index, partial(self.sim_history.row, time_index)
+
+    def __finish_run(self):
+        if self.sim_history is not None:
+            self.steps_simulated = len(self.sim_history)
+            self.final_states = self.sim_history[-1]
+        if self.steady_state is not None and self.steady_state.converged:
+            print("Steady state reached, simulation stopped after {} out of {} time steps".format(
+                self.steps_simulated, self.time_steps))
+            for metric, (low, high) in self.steady_state.confidence_interval.items():
+                print("{} per time step: {:.4f} ({:.4f} - {:.4f})".format(metric, self.steady_state.mean[metric],
+                                                                          low, high))
+        elif self.steps_simulated < self.time_steps:
+            print("Warning: memory limit reached, simulation stopped after {} out of {} time steps".format(
+                self.steps_simulated, self.time_steps))
+            self.truncated = True
+        if self.steps_simulated < self.time_steps:
+            self.time_steps = self.steps_simulated
+            if self.position_history is not None:
+                self.position_history = self.position_history[:self.time_steps]
+        if self.sim_history is not None:
+            print("Simulation resulted in {} states stored in 'sim_history' ({:.1f} MB)".format(
+                self.sim_history.size, self.sim_history.nbytes / 1e6))
+        else:
+            print("Simulation ran {} time steps, final states stored in 'final_states'".format(self.steps_simulated))
 
         final_statistics = Statistics()
         print("simulation results:")
         for actor_index, actor in enumerate(self.actors):
-            stats = self.sim_history[-1][actor_index]
+            stats = self.final_states[actor_index]
             print("node: {}".format(actor_index))
             print("number of collisions: {}".format(stats.num_collisions))
             print("number of dropped messages: {}".format(stats.num_dropped_messages))
             print("number of succesfull transmissions: {}".format(stats.num_successful_transmissions))
             print("number of transmission attempts: {}".format(stats.num_transmission_attempts))
+            print("number of queue drops: {}".format(stats.num_queue_drops))
             print("transmission times: {}".format(stats.transmission_times))
 
-            final_statistics.transmission_times.extend(stats.transmission_times)
+            final_statistics.add_transmission_times(stats.transmission_times)
             final_statistics.num_collisions += stats.num_collisions
             final_statistics.num_dropped_messages += stats.num_dropped_messages
             final_statistics.num_successful_transmissions += stats.num_successful_transmissions
             final_statistics.num_transmission_attempts += stats.num_transmission_attempts
             final_statistics.num_messages += stats.num_messages
+            final_statistics.num_queue_drops += stats.num_queue_drops
 
         final_statistics.transmission_time_stats()
         print("final counts")
@@ -135,18 +410,504 @@ class Oracle(object):
         print("number of dropped messages: {}".format(final_statistics.num_dropped_messages))
         print("number of succesfull transmissions: {}".format(final_statistics.num_successful_transmissions))
         print("number of transmission attempts: {}".format(final_statistics.num_transmission_attempts))
+        print("number of queue drops: {}".format(final_statistics.num_queue_drops))
         print("total messages = {}".format(final_statistics.num_messages))
 
         print("transmission time statistics")
         print("min: {}\nmax: {}\nmean: {}".format(final_statistics.transmission_times_min,
                                                   final_statistics.transmission_times_max,
                                                   final_statistics.transmission_times_mean))
-        print("times: {}".format(final_statistics.transmission_times))
+        if self.keep_history:
+            print("times: {}".format(final_statistics.transmission_times))
+        else:
+            print("times (histogram): {}".format(final_statistics.transmission_time_histogram))
+        self.statistics = final_statistics
 
-        pass
+    def preprocess_ensemble(self,
+                            num_replicas: int,
+                            time_steps: int,
+                            delta_time: int,
+                            transmission_chance: float,
+                            transmission_range: float,
+                            regenerate_positions: bool = False,
+                            protocol: MacProtocol = None,
+                            queue_limit: int = None,
+                            queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP,
+                            seed: int = None) -> EnsembleStatistics:
+        """
+        Simulate 'num_replicas' independent runs of the current topology and load at once, instead of calling
+        preprocess once per seed. Only statistics are kept: 'ensemble_statistics' holds those of every replica
+        and their mean and confidence interval. 'seed' derives the streams of all replicas from one root seed.
+        """
+        assert len(self.actors) != 0 or regenerate_positions is True
+        if regenerate_positions is True:
+            self.generate_actors()
+        self.transmission_chance = transmission_chance
+        self.actor_range = transmission_range
+        self.delta_time = delta_time
+        self.time_steps = time_steps
+        self.__determine_neighbours(transmission_range)
 
-        # Store (optional)
-        # - store as JSON with parameters
+        print("Processing guiSimMac - {} replicas of {} time steps (ensemble)".format(num_replicas, time_steps))
+        identifiers = [actor.identifier for actor in self.actors]
+        ensemble_engine = EnsembleMacEngine(identifiers, self.node_positions_np, self.neighbour_table, num_replicas,
+                                            protocol, queue_limit, queue_drop_policy, seed)
+        ensemble_engine.run(time_steps, transmission_chance)
+        self.ensemble_statistics = EnsembleStatistics(ensemble_engine.get_replica_statistics())
+
+        print("ensemble mean [95% confidence interval] over {} replicas".format(num_replicas))
+        for metric in EnsembleStatistics.METRICS:
+            low, high = self.ensemble_statistics.confidence_interval[metric]
+            print("{}: {:.2f} [{:.2f}, {:.2f}]".format(metric, self.ensemble_statistics.mean[metric], low, high))
+        return self.ensemble_statistics
+
+    def run_engine(self, engine: OracleEngine):
+        for _ in self.__engine_steps(engine):
+            pass
+
+    def __engine_steps(self, engine: OracleEngine) -> Iterator[Tuple[int, Callable[[], List[FrozenActorState]]]]:
+        """
+        Simulate all actors in this process, reading arrivals from 'arrival_schedule'.
+        """
+        if engine is not OracleEngine.VECTORIZED:
+            self.__assign_neighbours()
+            for actor in self.actors:
+                actor.state.queue_limit = self.queue_limit
+                actor.state.queue_drop_policy = self.queue_drop_policy
+            if self.snapshot_interval is not None:
+                self.checkpoints[-1] = EngineSnapshot.capture_actors(-1, [actor.state for actor in self.actors],
+                                                                     self.message_pool)
+        if engine is OracleEngine.VECTORIZED:
+            yield from self.__vectorized_engine_steps()
+        elif engine is OracleEngine.EVENT:
+            self.__run_event_engine()
+            yield from self.__history_steps()
+        else:
+            yield from self.__object_engine_steps()
+
+    def __run_components(self, engine: OracleEngine, workers: int):
+        assert workers > 0
+        num_components, components = self.neighbour_table.connected_components()
+        num_groups = min(num_components, COMPONENT_GROUPS)
+        print("Processing guiSimMac - {} connected components in {} group(s) on {} worker(s)".format(
+            num_components, num_groups, workers))
+
+        # Largest components first into the group with the fewest nodes so far, so the groups are about as large
+        component_sizes = np.bincount(components, minlength=num_components)
+        group_sizes = np.zeros(num_groups, dtype=np.int64)
+        group_of_component = np.zeros(num_components, dtype=np.int64)
+        for component in np.argsort(-component_sizes, kind='stable').tolist():
+            group = int(np.argmin(group_sizes))
+            group_of_component[component] = group
+            group_sizes[group] += component_sizes[component]
+        groups = group_of_component[components]
+        group_nodes = [np.flatnonzero(groups == group) for group in range(num_groups)]
+
+        # Every group reads the arrivals of the run from its own copy of the (not yet iterated) source
+        tasks = list()
+        for group, nodes in enumerate(group_nodes):
+            tasks.append(ComponentTask(engine, self.time_steps,
+                                       [self.actors[node].identifier for node in nodes.tolist()],
+                                       self.node_positions_np[nodes], self.neighbour_table.subgraph(nodes),
+                                       self.node_seeds[nodes],
+                                       ArrivalSubset(copy.deepcopy(self.arrival_schedule), nodes),
+                                       group + 1, num_groups,
+                                       self.protocol, self.queue_limit, self.queue_drop_policy, self.checked))
+        # Largest groups first, so no long task is started last
+        task_order = sorted(range(num_groups), key=lambda group: -len(group_nodes[group]))
+        ordered_tasks = [tasks[group] for group in task_order]
+
+        if workers == 1:
+            histories = map(simulate_component, ordered_tasks)
+            self.sim_history = HistoryStore.merge_columns(self.num_nodes, [
+                (group_nodes[group], history) for group, history in zip(task_order, histories)])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                histories = executor.map(simulate_component, ordered_tasks)
+                self.sim_history = HistoryStore.merge_columns(self.num_nodes, [
+                    (group_nodes[group], history) for group, history in zip(task_order, histories)])
+
+    def __run_tiles(self, tiles: int):
+        identifiers = [actor.identifier for actor in self.actors]
+        tiled_engine = TiledMacEngine(identifiers, self.node_positions_np, self.neighbour_table, tiles, self.node_seeds,
+                                      self.queue_limit, self.queue_drop_policy)
+        print("Processing guiSimMac - {} tiles with {} halo nodes".format(tiles, tiled_engine.num_ghosts))
+        self.sim_history = tiled_engine.run(self.arrival_schedule)
+
+    def __report(self, message: str):
+        if self.report_progress:
+            print(message)
+
+    def __assign_neighbours(self):
+        for index, actor in enumerate(self.actors):
+            neighbour_states = [self.actors[neighbour].state for neighbour in self.neighbour_table.neighbours(index)]
+            actor.set_neighbours(neighbour_states, self.neighbour_table.neighbour_distances(index).tolist())
+
+        if self.checked:
+            self.__report("Pre-processing guiSimMac - performing node neighbour sanity checks")
+            check_neighbour_references([actor.state for actor in self.actors])
+
+    def __move_nodes(self):
+        positions = self.mobility.next_positions(self.node_positions_np)
+        changed = self.mobile_neighbours.move(positions)
+        self.node_positions_np = positions
+        for actor, position in zip(self.actors, positions):
+            actor.position = position
+            actor.state.position = position
+        self.neighbour_table = self.mobile_neighbours.neighbour_table
+        for node in changed.tolist():
+            neighbour_states = [self.actors[neighbour].state for neighbour in self.neighbour_table.neighbours(node)]
+            self.actors[node].set_neighbours(neighbour_states, self.neighbour_table.neighbour_distances(node).tolist())
+
+    def __object_engine_steps(self, start_index: int = 0, arrival_steps: Iterator[np.ndarray] = None) \
+            -> Iterator[Tuple[int, Callable[[], List[FrozenActorState]]]]:
+        self.__report("Processing guiSimMac - time steps")
+        if self.mobility is not None:
+            self.mobile_neighbours = MobileNeighbourIndex(self.neighbour_table, self.node_positions_np,
+                                                          self.actor_range)
+            if self.keep_history:
+                self.position_history = np.empty((self.time_steps,) + self.node_positions_np.shape)
+        if arrival_steps is None:
+            arrival_steps = self.arrival_schedule.iter_steps()
+
+        recorder = HistoryRecorder([actor.identifier for actor in self.actors],
+                                   [actor.state.transmission_times for actor in self.actors])
+
+        def history_rows(first_index: int, end_index: int) -> HistoryStore:
+            return recorder.rows(first_index - start_index, end_index - start_index)
+
+        end_index = start_index
+        for time_index, new_messages in enumerate(arrival_steps, start_index):
+            if (time_index % 100) == 0:
+                self.__report("Ran time index {} out of {} time steps".format(time_index, self.time_steps))
+            if self.memory_ceiling is not None and self.memory_ceiling.exceeded(time_index):
+                break
+            if self.mobility is not None:
+                if self.mobility.moves_at(time_index):
+                    self.__move_nodes()
+                if self.position_history is not None:
+                    self.position_history[time_index] = self.node_positions_np
+            # print("time {}".format(self.delta_time * time_index))
+            # 1) propagate waves
+            for actor in self.actors:
+                actor.prop_messages()
+
+            # 2) Transform state, flatten list and store list of state of nodes in 2D time-node state matrix
+            # - Update any nodes with outstanding 'arrivals', MAC update and/or 'out-of-range messages'
+            for actor_index, actor in enumerate(self.actors):
+                actor.progress_time(new_messages[actor_index])
+            # 3) Save state
+            if self.keep_history:
+                recorder.record_states([actor.state for actor in self.actors])
+            end_index = time_index + 1
+            if self.checked:
+                check_actor_states(time_index, [actor.state for actor in self.actors])
+            # Observed before a checkpoint is written, which then holds the detector after this step
+            converged = self.__steady_state_reached(time_index, lambda: {
+                metric: sum(getattr(actor.state, metric) for actor in self.actors)
+                for metric in SteadyStateDetector.METRICS})
+            self.__after_step(time_index, lambda: EngineSnapshot.capture_actors(
+                time_index, [actor.state for actor in self.actors], self.message_pool), history_rows)
+            yield time_index, lambda: [actor.state.get_frozen_state() for actor in self.actors]
+            if converged:
+                break
+        # Flatten result
+        if self.keep_history:
+            self.__store_history(history_rows(start_index, end_index))
+        else:
+            self.__store_final_states([actor.state.get_frozen_state() for actor in self.actors], end_index)
+
+    def __after_step(self, time_index: int, capture: Callable[[], EngineSnapshot],
+                     history_rows: Callable[[int, int], HistoryStore]):
+        """
+        Keep a snapshot and/or write a checkpoint when either is due after 'time_index', capturing the engine once.
+        'history_rows' returns the rows of a range of time indices simulated by this run.
+        """
+        keep = self.snapshot_interval is not None and (time_index + 1) % self.snapshot_interval == 0
+        write = self.checkpoint_writer is not None and self.checkpoint_writer.due(time_index)
+        if not keep and not write:
+            return
+        snapshot = capture()
+        if keep:
+            self.checkpoints[time_index] = snapshot
+        if write:
+            flushed_index = self.checkpoint_writer.flushed_index
+            if self.shared_history is not None and flushed_index < len(self.shared_history):
+                rows = HistoryStore.concatenate([self.shared_history[flushed_index:],
+                                                 history_rows(len(self.shared_history), time_index + 1)])
+            else:
+                rows = history_rows(flushed_index, time_index + 1)
+            self.checkpoint_writer.write(snapshot, rows, self.__run_parameters(), self.arrival_schedule)
+            self.__report("Checkpoint after time index {} written to {}".format(time_index,
+                                                                                self.checkpoint_writer.directory))
+
+    def __steady_state_reached(self, time_index: int, totals: Callable[[], Dict[str, int]]) -> bool:
+        # 'totals' sums the counters of all nodes, only called at the batch boundaries of the detector
+        if self.steady_state is None or not self.steady_state.due(time_index):
+            return False
+        return self.steady_state.observe(time_index, totals())
+
+    def __run_parameters(self) -> Dict[str, Any]:
+        # Oracle attributes a resumed run needs besides the engine state
+        return dict(num_nodes=self.num_nodes, positional_spread=self.positional_spread,
+                    node_positions_np=self.node_positions_np, neighbour_table=self.neighbour_table,
+                    actor_range=self.actor_range, delta_time=self.delta_time, time_steps=self.time_steps,
+                    transmission_chance=self.transmission_chance, node_seeds=self.node_seeds,
+                    root_seed=self.root_seed,
+                    protocol=self.protocol, queue_limit=self.queue_limit, queue_drop_policy=self.queue_drop_policy,
+                    snapshot_interval=self.snapshot_interval, checked=self.checked,
+                    memory_ceiling=self.memory_ceiling, steady_state=self.steady_state,
+                    checkpoint_interval=self.checkpoint_writer.interval)
+
+    def __store_history(self, sim_history: HistoryStore):
+        # A forked run only simulated the steps after the shared rows of its parent
+        if self.shared_history is not None:
+            sim_history = HistoryStore.chain(self.shared_history, sim_history)
+        self.sim_history = sim_history
+
+    def __store_final_states(self, final_states: List[FrozenActorState], steps_simulated: int):
+        self.sim_history = None
+        self.final_states = final_states
+        self.steps_simulated = steps_simulated
+
+    def __vectorized_engine_steps(self, mac_engine: VectorizedMacEngine = None, start_index: int = 0,
+                                  arrival_steps: Iterator[np.ndarray] = None) \
+            -> Iterator[Tuple[int, Callable[[], List[FrozenActorState]]]]:
+        if mac_engine is None:
+            self.__report("Pre-processing guiSimMac - building vectorized engine")
+            identifiers = [actor.identifier for actor in self.actors]
+            mac_engine = VectorizedMacEngine(identifiers, self.node_positions_np, self.neighbour_table,
+                                             message_pool=self.message_pool,
+                                             rngs=None if self.node_seeds is None else
+                                             [actor.state.rng for actor in self.actors],
+                                             protocol=self.protocol,
+                                             queue_limit=self.queue_limit,
+                                             queue_drop_policy=self.queue_drop_policy)
+            if not self.keep_history:
+                mac_engine.transmission_times = [TransmissionTimeHistogram() for _ in self.actors]
+            if self.snapshot_interval is not None:
+                self.checkpoints[-1] = EngineSnapshot.capture_engine(-1, mac_engine)
+
+        self.__report("Processing guiSimMac - time steps (vectorized)")
+        if arrival_steps is None:
+            arrival_steps = self.arrival_schedule.iter_steps()
+        recorder = HistoryRecorder(mac_engine.identifiers, mac_engine.transmission_times)
+
+        def history_rows(first_index: int, end_index: int) -> HistoryStore:
+            return recorder.rows(first_index - start_index, end_index - start_index)
+
+        end_index = start_index
+        for time_index, new_messages in enumerate(arrival_steps, start_index):
+            if (time_index % 100) == 0:
+                self.__report("Ran time index {} out of {} time steps".format(time_index, self.time_steps))
+            if self.memory_ceiling is not None and self.memory_ceiling.exceeded(time_index):
+                break
+            mac_engine.prop_messages()
+            mac_engine.progress_time(new_messages)
+            if self.keep_history:
+                recorder.record_columns(*mac_engine.history_columns())
+            end_index = time_index + 1
+            if self.checked:
+                check_vectorized_engine(time_index, mac_engine)
+            converged = self.__steady_state_reached(time_index, lambda: {
+                metric: int(getattr(mac_engine, metric).sum()) for metric in SteadyStateDetector.METRICS})
+            self.__after_step(time_index, lambda: EngineSnapshot.capture_engine(time_index, mac_engine), history_rows)
+            yield time_index, mac_engine.get_frozen_states
+            if converged:
+                break
+        if self.keep_history:
+            self.__store_history(history_rows(start_index, end_index))
+        else:
+            self.__store_final_states(mac_engine.get_frozen_states(), end_index)
+
+    def __run_event_engine(self):
+        self.__report("Processing guiSimMac - events")
+        event_engine = EventMacEngine(self.actors, self.time_steps)
+        self.sim_history = event_engine.run(self.arrival_schedule, self.memory_ceiling)
+        if self.checked:
+            check_actor_states(len(self.sim_history) - 1, [actor.state for actor in self.actors])
+        self.__report("Processed {} actor events instead of {} actor steps".format(event_engine.num_events,
+                                                                                   self.time_steps * self.num_nodes))
+
+    def __arrivals_at(self, time_index: int) -> np.ndarray:
+        # Every arrival, queued or dropped, increments the message count of its node
+        counts = self.sim_history.counter('num_messages', time_index)
+        if time_index == 0:
+            return counts > 0
+        return counts > self.sim_history.counter('num_messages', time_index - 1)
+
+    @staticmethod
+    def __replay_key(state: FrozenActorState):
+        # Messages hold their origin as an array, so frozen states are compared by counters and packets instead
+        return (state.macState, state.num_messages, state.num_transmission_attempts, state.num_collisions,
+                state.num_dropped_messages, [message.packet_id for message in state.queued_messages],
+                [(message.packet_id, message.prop_distance) for message in state.in_transit_messages])
+
+    def __check_replay(self, time_index: int, frozen_states: List[FrozenActorState]):
+        recorded_states = self.sim_history[time_index]
+        assert all(self.__replay_key(frozen_state) == self.__replay_key(recorded_state)
+                   for frozen_state, recorded_state in zip(frozen_states, recorded_states))
+
+    def snapshot(self, time_index: int) -> EngineSnapshot:
+        """
+        Restorable engine state after simulating 'time_index'. The nearest earlier checkpoint is restored and stepped
+        forward with the arrivals recorded in 'sim_history', so the run has to be made with 'snapshot_interval'.
+        The steps that are replayed are checked against 'sim_history'.
+        """
+        assert 0 <= time_index < self.time_steps
+        assert len(self.checkpoints) > 0, "Run preprocess with a snapshot_interval to take snapshots"
+        checkpoint = self.checkpoints[max(index for index in self.checkpoints if index <= time_index)]
+        if checkpoint.time_index == time_index:
+            return checkpoint
+
+        # Replay on the generator state of the checkpoint, without disturbing the module-level generator
+        random_state = random.getstate()
+        random.setstate(checkpoint.random_state)
+        try:
+            if checkpoint.engine is OracleEngine.VECTORIZED:
+                mac_engine = checkpoint.restore_engine()
+                for replay_index in range(checkpoint.time_index + 1, time_index + 1):
+                    mac_engine.prop_messages()
+                    mac_engine.progress_time(self.__arrivals_at(replay_index))
+                self.__check_replay(time_index, mac_engine.get_frozen_states())
+                return EngineSnapshot.capture_engine(time_index, mac_engine)
+
+            states, message_pool = checkpoint.restore_actors()
+            for replay_index in range(checkpoint.time_index + 1, time_index + 1):
+                for state in states:
+                    state.prop_messages()
+                for state, new_message in zip(states, self.__arrivals_at(replay_index).tolist()):
+                    state.progress_actorstate_time(new_message)
+            self.__check_replay(time_index, [state.get_frozen_state() for state in states])
+            return EngineSnapshot.capture_actors(time_index, states, message_pool)
+        finally:
+            random.setstate(random_state)
+
+    def fork(self,
+             snapshot: EngineSnapshot,
+             transmission_chance: float = None,
+             max_attempts: int = None,
+             packet_length: float = None,
+             time_steps: int = None,
+             seed: int = None) -> 'Oracle':
+        """
+        What-if run: a new oracle that continues from 'snapshot' (see snapshot) with other parameters, for the
+        remaining steps up to 'time_steps' (those of this run by default). Only the steps after the snapshot are
+        simulated; the rows of 'sim_history' up to it are this run's states, shared instead of copied.
+        New arrivals are drawn with the given 'transmission_chance', 'max_attempts' applies to every message that
+        collides from the snapshot on and 'packet_length' to every data message put on the antenna from then on, up
+        to the range the messages travel (SimConsts.TRANSMISSION_RANGE).
+        The new arrivals are drawn from 'seed', or from a seed derived from the root seed of this run and the time
+        index of the snapshot if this run was seeded, so forks from the same snapshot draw the same arrivals.
+        """
+        if not 0 <= snapshot.time_index < self.time_steps:
+            raise ValueError("snapshot at time index {} is outside this run of {} time steps".format(
+                snapshot.time_index, self.time_steps))
+        # A longer message would be clipped at the range its waves travel to (that of every message, not the
+        # neighbour range 'actor_range') while still on the antenna
+        if packet_length is not None and not 0 < packet_length <= SimConsts.TRANSMISSION_RANGE:
+            raise ValueError("packet_length must lie in (0, {}], got {}".format(SimConsts.TRANSMISSION_RANGE,
+                                                                             packet_length))
+        fork = Oracle(self.num_nodes, self.positional_spread)
+        fork.report_progress = self.report_progress
+        fork.node_positions_np = self.node_positions_np
+        fork.neighbour_table = self.neighbour_table
+        fork.topology = self.topology
+        fork.node_seeds = self.node_seeds
+        fork.root_seed = self.root_seed
+        fork.protocol = self.protocol
+        fork.queue_limit = self.queue_limit
+        fork.queue_drop_policy = self.queue_drop_policy
+        fork.checked = self.checked
+        fork.actor_range = self.actor_range
+        fork.delta_time = self.delta_time
+        fork.transmission_chance = transmission_chance if transmission_chance is not None else self.transmission_chance
+        fork.time_steps = time_steps if time_steps is not None else self.time_steps
+        fork.snapshot_interval = self.snapshot_interval
+        fork.checkpoints = {index: checkpoint for index, checkpoint in self.checkpoints.items()
+                            if index < snapshot.time_index}
+        fork.checkpoints[snapshot.time_index] = snapshot
+        fork.shared_history = self.sim_history[:snapshot.time_index + 1]
+
+        start_index = snapshot.time_index + 1
+        if fork.time_steps < start_index:
+            raise ValueError("time_steps {} ends before the snapshot at time index {}".format(fork.time_steps,
+                                                                                         snapshot.time_index))
+        if seed is not None:
+            arrival_seed = np.random.SeedSequence(seed)
+        elif self.root_seed is not None:
+            arrival_seed = np.random.SeedSequence(self.root_seed.entropy,
+                                                  spawn_key=self.root_seed.spawn_key + (FORK_SEED_KEY,
+                                                                                        snapshot.time_index))
+        else:
+            arrival_seed = None
+        fork.arrival_schedule = ArrivalSchedule(
+            self.num_nodes, fork.time_steps - start_index, fork.transmission_chance,
+            generator=np.random.default_rng(arrival_seed) if arrival_seed is not None else None)
+        print("Processing guiSimMac - fork from time index {}".format(snapshot.time_index))
+        fork.__continue_from(snapshot, fork.arrival_schedule.iter_steps(), max_attempts, packet_length)
+        return fork
+
+    @staticmethod
+    def resume(checkpoint_dir: str) -> 'Oracle':
+        """
+        Continue a run from the last checkpoint written to 'checkpoint_dir' (see preprocess) and return its oracle.
+        The engine, the arrivals not consumed yet, the steady state detector, the memory ceiling and the generator
+        states are restored, so the result is the same as that of the uninterrupted run. The resumed run keeps writing
+        checkpoints to the same directory.
+        """
+        checkpoint, shared_history = load_checkpoint(checkpoint_dir)
+        parameters = dict(checkpoint.parameters)
+        oracle = Oracle(parameters.pop('num_nodes'), parameters.pop('positional_spread'))
+        oracle.checkpoint_writer = CheckpointWriter(checkpoint_dir, parameters.pop('checkpoint_interval'),
+                                                    checkpoint.history_segments, len(shared_history))
+        for name, value in parameters.items():
+            setattr(oracle, name, value)
+        oracle.arrival_schedule = checkpoint.arrival_schedule
+        oracle.shared_history = shared_history
+        if oracle.snapshot_interval is not None:
+            oracle.checkpoints[checkpoint.snapshot.time_index] = checkpoint.snapshot
+
+        if oracle.steady_state is not None and oracle.steady_state.converged:
+            # The run stopped at this checkpoint
+            oracle.sim_history = shared_history
+            oracle.__finish_run()
+            return oracle
+
+        print("Processing guiSimMac - resuming after time index {}".format(checkpoint.snapshot.time_index))
+        np.random.set_state(checkpoint.numpy_random_state)
+        start_index = checkpoint.snapshot.time_index + 1
+        oracle.__continue_from(checkpoint.snapshot, oracle.arrival_schedule.iter_steps(start_index))
+        return oracle
+
+    def __continue_from(self, snapshot: EngineSnapshot, arrival_steps: Iterator[np.ndarray],
+                        max_attempts: int = None, packet_length: float = None):
+        start_index = snapshot.time_index + 1
+        random.setstate(snapshot.random_state)
+        if snapshot.engine is OracleEngine.VECTORIZED:
+            mac_engine = snapshot.restore_engine()
+            if max_attempts is not None:
+                mac_engine.max_attempts = max_attempts
+            if packet_length is not None:
+                mac_engine.set_data_packet_length(packet_length)
+            self.message_pool = mac_engine.message_pool
+            self.actors = [ActorStateHistory(identifier, position, message_pool=self.message_pool)
+                           for identifier, position in zip(mac_engine.identifiers, self.node_positions_np)]
+            for _ in self.__vectorized_engine_steps(mac_engine, start_index, arrival_steps):
+                pass
+        else:
+            states, self.message_pool = snapshot.restore_actors()
+            for state in states:
+                if max_attempts is not None:
+                    state.max_attempts = max_attempts
+                if packet_length is not None:
+                    state.data_packet_length = packet_length
+                    for message in state.queued_messages:
+                        message.prop_packet_length = packet_length
+            self.actors = [ActorStateHistory(state.identifier, state.position, state=state) for state in states]
+            for _ in self.__object_engine_steps(start_index, arrival_steps):
+                pass
+        self.__finish_run()
 
     def replay(self):
         pass
@@ -166,32 +927,3 @@ if __name__ == '__main__':
     # for state in actor.history:
     #     print(len(state.queued_messages))
     print("Oracle done simulating.")
-
-
-class Statistics:
-    num_collisions: int
-    num_dropped_messages: int
-    num_successful_transmissions: int
-    num_transmission_attempts: int
-    num_messages: int
-
-    transmission_times: list
-
-    def __init__(self):
-        self.num_collisions = 0
-        self.num_dropped_messages = 0
-        self.num_successful_transmissions = 0
-        self.num_transmission_attempts = 0
-        self.num_messages = 0
-
-        self.transmission_times = list()
-        self.transmission_times_min = 0
-        self.transmission_times_max = 0
-        self.transmission_times_mean = 0
-
-
-    def transmission_time_stats(self):
-        self.transmission_times.sort()
-        self.transmission_times_min = min(self.transmission_times)
-        self.transmission_times_max = max(self.transmission_times)
-        self.transmission_times_mean = statistics.mean(self.transmission_times)
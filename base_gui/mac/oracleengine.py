@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class OracleEngine(Enum):
+    OBJECT = 0
+    VECTORIZED = 1
+    EVENT = 2
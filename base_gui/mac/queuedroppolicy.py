@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class QueueDropPolicy(Enum):
+    TAIL_DROP = 0  # Discard the new arrival
+    OLDEST_DROP = 1  # Discard the message at the head of the queue to make room
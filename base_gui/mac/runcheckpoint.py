@@ -0,0 +1,78 @@
+import os
+import pickle
+from typing import List, Dict, Any, Tuple
+
+import attr
+import numpy as np
+
+from base_gui.mac.arrivalschedule import ArrivalSource
+from base_gui.mac.enginesnapshot import EngineSnapshot
+from base_gui.mac.historystore import HistoryStore
+
+STATE_FILE = 'checkpoint.pkl'
+
+
+@attr.attrs(auto_attribs=True, frozen=True)
+class RunCheckpoint(object):
+    """
+    Everything needed to continue an oracle run after 'snapshot.time_index': the run parameters, the engine, the
+    arrivals not consumed yet and both generator states. The history is kept apart, in the listed segment files.
+    """
+    parameters: Dict[str, Any]
+    snapshot: EngineSnapshot
+    numpy_random_state: tuple
+    arrival_schedule: ArrivalSource
+    history_segments: List[str]
+
+
+class CheckpointWriter(object):
+    """
+    Periodic checkpoints of a run in 'directory'. Every checkpoint appends the history rows simulated since the
+    previous one as a segment file, so the history is written once, and then replaces the state file atomically:
+    an interrupted write leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, directory: str, interval: int, history_segments: List[str] = None, flushed_index: int = 0):
+        if interval < 1:
+            raise ValueError("checkpoint interval must be at least 1, got {}".format(interval))
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self.history_segments = list(history_segments) if history_segments is not None else list()
+        # Number of history rows in the segment files
+        self.flushed_index = flushed_index
+
+    def due(self, time_index: int) -> bool:
+        return (time_index + 1) % self.interval == 0
+
+    def write(self, snapshot: EngineSnapshot, history_rows: HistoryStore, parameters: Dict[str, Any],
+              arrival_schedule: ArrivalSource):
+        """
+        Checkpoint after 'snapshot.time_index', 'history_rows' are the rows from 'flushed_index' up to it.
+        """
+        assert self.flushed_index + len(history_rows) == snapshot.time_index + 1
+        segment = 'history-{:09d}.pkl'.format(snapshot.time_index + 1)
+        with open(os.path.join(self.directory, segment), 'wb') as segment_file:
+            pickle.dump(history_rows, segment_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.history_segments.append(segment)
+        self.flushed_index = snapshot.time_index + 1
+
+        checkpoint = RunCheckpoint(parameters, snapshot, np.random.get_state(), arrival_schedule,
+                                   list(self.history_segments))
+        state_path = os.path.join(self.directory, STATE_FILE)
+        with open(state_path + '.tmp', 'wb') as state_file:
+            pickle.dump(checkpoint, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(state_path + '.tmp', state_path)
+
+
+def load_checkpoint(directory: str) -> Tuple[RunCheckpoint, HistoryStore]:
+    """
+    Read the last checkpoint in 'directory' and the history up to it.
+    """
+    with open(os.path.join(directory, STATE_FILE), 'rb') as state_file:
+        checkpoint: RunCheckpoint = pickle.load(state_file)
+    segments = list()
+    for segment in checkpoint.history_segments:
+        with open(os.path.join(directory, segment), 'rb') as segment_file:
+            segments.append(pickle.load(segment_file))
+    return checkpoint, HistoryStore.concatenate(segments)
@@ -0,0 +1,35 @@
+class SimConsts(object):
+    @staticmethod
+    def set_num_nodes_mac(num_nodes_mac):
+        SimConsts.NUM_NODES_MAC = num_nodes_mac
+        SimConsts.set_simconsts_network_load(SimConsts.TRAFFIC_LOAD)
+
+    @staticmethod
+    def set_simconsts_network_load(network_load):
+        SimConsts.TRAFFIC_LOAD = network_load
+        SimConsts.MESSAGE_ARRIVAL_PROBABILITY = SimConsts.TRAFFIC_LOAD / SimConsts.NUM_NODES_MAC
+
+    @staticmethod
+    def get_simconsts_traffic_load():
+        return SimConsts.TRAFFIC_LOAD
+
+    TIME_MAX_STEPS = 1000
+    TIME_STEP = 1
+
+    # MAC SIMULATION PARAMETERS
+    NUM_NODES_MAC = 10
+    DISTANCE_SPREAD_SIGMA_MAC = 250
+
+    WAVE_VELOCITY = 1  # meters per timestep
+
+    PACKET_LENGTH_SPACE = 10  # meters
+    JAMMING_LENGTH_SPACE = 1  # meters
+
+    TRANSMISSION_RANGE = 20  # meters
+
+    TRAFFIC_LOAD = 0.01  # Messages per timestep
+    MESSAGE_ARRIVAL_PROBABILITY = TRAFFIC_LOAD / NUM_NODES_MAC  # Message chance per timestep
+    assert MESSAGE_ARRIVAL_PROBABILITY <= 1
+
+    # MAXIMAL NUMBER OF RETRANSMISSION ATTEMPTS BEFORE DROPPIING THE PACKAGE
+    MAX_ATTEMPTS = 6
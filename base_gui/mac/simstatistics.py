@@ -0,0 +1,114 @@
+import math
+import statistics
+from collections import Counter
+from typing import List, Dict, Tuple, Union
+
+# Two-sided 95% quantiles of Student's t distribution by degrees of freedom, the normal quantile beyond the table
+T_QUANTILES_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+Z_QUANTILE_95 = 1.960
+
+
+class TransmissionTimeHistogram(object):
+    """
+    Number of transmissions per transmission time, kept by a node instead of the list of its transmission times when
+    no history is kept. It grows with the number of distinct times, not with the length of the run.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def append(self, transmission_time):
+        self.counts[transmission_time] += 1
+
+    def update(self, other: 'TransmissionTimeHistogram'):
+        self.counts.update(other.counts)
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def min(self):
+        return min(self.counts)
+
+    def max(self):
+        return max(self.counts)
+
+    def mean(self):
+        return sum(time * count for time, count in self.counts.items()) / len(self)
+
+    def __repr__(self):
+        return repr(dict(sorted(self.counts.items())))
+
+
+class Statistics(object):
+    num_collisions: int
+    num_dropped_messages: int
+    num_queue_drops: int
+    num_successful_transmissions: int
+    num_transmission_attempts: int
+    num_messages: int
+
+    transmission_times: list
+
+    def __init__(self):
+        self.num_collisions = 0
+        self.num_dropped_messages = 0
+        # Arrivals discarded by a full queue, not part of num_dropped_messages (retry limit)
+        self.num_queue_drops = 0
+        self.num_successful_transmissions = 0
+        self.num_transmission_attempts = 0
+        self.num_messages = 0
+
+        self.transmission_times = list()
+        # Transmission times of nodes that only kept a histogram
+        self.transmission_time_histogram = TransmissionTimeHistogram()
+        self.transmission_times_min = 0
+        self.transmission_times_max = 0
+        self.transmission_times_mean = 0
+
+    def add_transmission_times(self, transmission_times: Union[list, TransmissionTimeHistogram]):
+        if isinstance(transmission_times, TransmissionTimeHistogram):
+            self.transmission_time_histogram.update(transmission_times)
+        else:
+            self.transmission_times.extend(transmission_times)
+
+    def transmission_time_stats(self):
+        self.transmission_times.sort()
+        if len(self.transmission_time_histogram) > 0:
+            self.transmission_times_min = self.transmission_time_histogram.min()
+            self.transmission_times_max = self.transmission_time_histogram.max()
+            self.transmission_times_mean = self.transmission_time_histogram.mean()
+            return
+        if len(self.transmission_times) == 0:
+            return
+        self.transmission_times_min = min(self.transmission_times)
+        self.transmission_times_max = max(self.transmission_times)
+        self.transmission_times_mean = statistics.mean(self.transmission_times)
+
+
+class EnsembleStatistics(object):
+    """
+    Statistics of independent replicas of the same topology and load: the Statistics of every replica and the mean
+    and 95% confidence interval (Student's t) of each total over the replicas.
+    """
+    METRICS = ('num_collisions', 'num_dropped_messages', 'num_queue_drops', 'num_successful_transmissions',
+               'num_transmission_attempts', 'num_messages', 'transmission_times_mean')
+
+    def __init__(self, replicas: List[Statistics]):
+        assert len(replicas) > 0
+        self.replicas = replicas
+        self.mean: Dict[str, float] = dict()
+        self.confidence_interval: Dict[str, Tuple[float, float]] = dict()
+
+        num_replicas = len(replicas)
+        if num_replicas - 1 <= len(T_QUANTILES_95):
+            quantile = T_QUANTILES_95[num_replicas - 2] if num_replicas > 1 else 0.0
+        else:
+            quantile = Z_QUANTILE_95
+        for metric in self.METRICS:
+            values = [getattr(replica, metric) for replica in replicas]
+            mean = statistics.mean(values)
+            half_width = quantile * statistics.stdev(values) / math.sqrt(num_replicas) if num_replicas > 1 else 0.0
+            self.mean[metric] = mean
+            self.confidence_interval[metric] = (mean - half_width, mean + half_width)
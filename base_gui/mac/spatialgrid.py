@@ -0,0 +1,96 @@
+import numpy as np
+
+# Cell offsets covering a cell and its 8 surrounding cells
+CELL_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class SpatialGrid(object):
+    """
+    Uniform grid over 2D node positions with square cells of 'cell_size' meters.
+    With the cell size set to the transmission range, every neighbour of a node lies in its own or one of the 8
+    surrounding cells, so pair queries only compare nearby candidates instead of all n² pairs.
+    """
+
+    def __init__(self, positions: np.ndarray, cell_size: float):
+        assert cell_size > 0
+        self.positions = positions
+        self.cell_size = cell_size
+
+        cells = np.floor(positions / cell_size).astype(np.int64)
+        # Pad the grid by one cell on each side so neighbouring cell keys never wrap onto another row
+        self.cell_origin = cells.min(axis=0) - 1 if len(cells) > 0 else np.zeros(2, dtype=np.int64)
+        cells -= self.cell_origin
+        self.num_cells_y = int(cells[:, 1].max()) + 2 if len(cells) > 0 else 1
+        self.cells = cells
+        self.keys = cells[:, 0] * self.num_cells_y + cells[:, 1]
+
+        self.order = np.argsort(self.keys, kind='stable')
+        self.sorted_keys = self.keys[self.order]
+
+    def cell_keys(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Keys of the cells holding 'positions'. Keys stay consistent for nodes that left the initial grid: cells
+        outside it may share a key with a cell at the other side (extra candidates), but are never missed.
+        """
+        cells = np.floor(positions / self.cell_size).astype(np.int64) - self.cell_origin
+        return cells[:, 0] * self.num_cells_y + cells[:, 1]
+
+    def move(self, nodes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """
+        Take the new positions of all nodes, of which only 'nodes' changed. Nodes that crossed into another cell are
+        taken out of the sorted cell order and merged back in at their new cell. Returns those nodes.
+        """
+        self.positions = positions
+        new_keys = self.cell_keys(positions[nodes])
+        crossing_mask = new_keys != self.keys[nodes]
+        crossing = nodes[crossing_mask]
+        if len(crossing) == 0:
+            return crossing
+        self.keys[crossing] = new_keys[crossing_mask]
+
+        is_crossing = np.zeros(len(self.keys), dtype=bool)
+        is_crossing[crossing] = True
+        staying = self.order[~is_crossing[self.order]]
+        crossing_sorted = crossing[np.argsort(self.keys[crossing], kind='stable')]
+        insert_at = np.searchsorted(self.keys[staying], self.keys[crossing_sorted], side='right')
+        self.order = np.insert(staying, insert_at, crossing_sorted)
+        self.sorted_keys = self.keys[self.order]
+        return crossing
+
+    def query_pairs(self, radius: float, nodes: np.ndarray = None):
+        """
+        Find all ordered pairs (receiver, transmitter) of distinct nodes closer than 'radius' (radius <= cell_size),
+        with the receiver among 'nodes' (all nodes if None).
+        Returns receiver indices, transmitter indices and distances, sorted by receiver and then transmitter.
+        """
+        assert radius <= self.cell_size
+        if nodes is None:
+            nodes = np.arange(len(self.positions))
+        candidates_rx = list()
+        candidates_tx = list()
+        for dx, dy in CELL_OFFSETS:
+            target_keys = self.keys[nodes] + dx * self.num_cells_y + dy
+            start = np.searchsorted(self.sorted_keys, target_keys, side='left')
+            end = np.searchsorted(self.sorted_keys, target_keys, side='right')
+            counts = end - start
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Expand each [start, end) range into the sorted positions it covers
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidates_rx.append(np.repeat(nodes, counts))
+            candidates_tx.append(self.order[np.repeat(start, counts) + offsets])
+
+        if len(candidates_rx) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float64)
+
+        rx = np.concatenate(candidates_rx)
+        tx = np.concatenate(candidates_tx)
+        distances = np.linalg.norm(self.positions[rx] - self.positions[tx], axis=1)
+        linked = (distances < radius) & (rx != tx)
+        rx, tx, distances = rx[linked], tx[linked], distances[linked]
+
+        sort = np.lexsort((tx, rx))
+        return rx[sort], tx[sort], distances[sort]
+
@@ -0,0 +1,64 @@
+import math
+import statistics
+from typing import Dict, Tuple
+
+from base_gui.mac.simstatistics import T_QUANTILES_95, Z_QUANTILE_95
+
+
+class SteadyStateDetector(object):
+    """
+    Early termination of an oracle run once the network rates have settled. The first 'warmup_steps' steps are
+    discarded, the rest is cut into batches of 'batch_steps' steps and the per step rate of every metric (network
+    totals) is estimated by the mean of the batch rates, with a 95% confidence interval (Student's t). The run stops
+    once, after at least 'min_batches' batches, the half width of every interval is within 'tolerance' times its mean.
+    Rates below the throughput (rare drops) only need the precision of the throughput, 'tolerance' times its mean, or
+    they would hold the run back indefinitely.
+    """
+    METRICS = ('num_successful_transmissions', 'num_collisions', 'num_dropped_messages', 'num_queue_drops')
+
+    def __init__(self, warmup_steps: int, tolerance: float, batch_steps: int = 100, min_batches: int = 10):
+        assert warmup_steps >= 0 and tolerance > 0 and batch_steps > 0 and min_batches > 1
+        self.warmup_steps = warmup_steps
+        self.tolerance = tolerance
+        self.batch_steps = batch_steps
+        self.min_batches = min_batches
+        # Totals at the start of the current batch, unknown until the warm-up has been simulated
+        self.batch_start_totals: Dict[str, int] = dict.fromkeys(self.METRICS, 0) if warmup_steps == 0 else None
+        self.batch_rates: Dict[str, list] = {metric: list() for metric in self.METRICS}
+        self.mean: Dict[str, float] = dict()
+        self.confidence_interval: Dict[str, Tuple[float, float]] = dict()
+        self.converged = False
+        self.steps_simulated = 0
+
+    def due(self, time_index: int) -> bool:
+        """
+        Whether 'observe' needs the totals after 'time_index', at the end of the warm-up and of every batch.
+        """
+        steps = time_index + 1 - self.warmup_steps
+        return steps >= 0 and steps % self.batch_steps == 0
+
+    def observe(self, time_index: int, totals: Dict[str, int]) -> bool:
+        """
+        Take the network totals after 'time_index' (when due) and return whether the steady state has been reached.
+        """
+        self.steps_simulated = time_index + 1
+        if self.batch_start_totals is None:
+            self.batch_start_totals = totals
+            return False
+        for metric in self.METRICS:
+            self.batch_rates[metric].append((totals[metric] - self.batch_start_totals[metric]) / self.batch_steps)
+        self.batch_start_totals = totals
+
+        num_batches = len(self.batch_rates[self.METRICS[0]])
+        if num_batches < self.min_batches:
+            return False
+        quantile = T_QUANTILES_95[num_batches - 2] if num_batches - 1 <= len(T_QUANTILES_95) else Z_QUANTILE_95
+        for metric, rates in self.batch_rates.items():
+            mean = statistics.mean(rates)
+            half_width = quantile * statistics.stdev(rates) / math.sqrt(num_batches)
+            self.mean[metric] = mean
+            self.confidence_interval[metric] = (mean - half_width, mean + half_width)
+        throughput = self.mean['num_successful_transmissions']
+        self.converged = all(high - mean <= self.tolerance * max(mean, throughput)
+                             for mean, (low, high) in zip(self.mean.values(), self.confidence_interval.values()))
+        return self.converged
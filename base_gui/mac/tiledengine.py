@@ -0,0 +1,260 @@
+import copy
+import math
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import List, Tuple, Optional, Dict
+
+import attr
+import numpy as np
+
+from base_gui.mac.actorstate import ActorState
+from base_gui.mac.arrivalschedule import ArrivalSource, ArrivalSubset
+from base_gui.mac.historystore import HistoryStore, HistoryRecorder, TYPE_BY_CODE, packet_row
+from base_gui.mac.message import Message
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.neighbourtable import NeighbourTable
+from base_gui.mac.noderandomstream import NodeRandomStream
+from base_gui.mac.queuedroppolicy import QueueDropPolicy
+
+# A wave front event of a boundary node: (node, packet_row and length of the message put on the antenna) or
+# (node, None) for a cut-off
+TransitEvent = Tuple[int, Optional[tuple]]
+
+
+def partition_tiles(positions: np.ndarray, num_tiles: int) -> np.ndarray:
+    """
+    Split the plane into a near-square grid of 'num_tiles' tiles holding (almost) the same number of nodes:
+    columns at quantiles of x, then rows at quantiles of y within each column. Returns the tile of every node.
+    """
+    num_columns = max(divisor for divisor in range(1, int(math.sqrt(num_tiles)) + 1) if num_tiles % divisor == 0)
+    num_rows = num_tiles // num_columns
+    tiles = np.zeros(len(positions), dtype=np.int64)
+    by_x = np.argsort(positions[:, 0], kind='stable')
+    for column, column_nodes in enumerate(np.array_split(by_x, num_columns)):
+        by_y = column_nodes[np.argsort(positions[column_nodes, 1], kind='stable')]
+        for row, tile_nodes in enumerate(np.array_split(by_y, num_rows)):
+            tiles[tile_nodes] = column * num_rows + row
+    return tiles
+
+
+@attr.attrs(auto_attribs=True, frozen=True)
+class TileTask(object):
+    """
+    A tile as seen by its worker process: the nodes it owns and the halo of nodes of other tiles within
+    transmission range of them (ghosts), all in ascending global index.
+    """
+    tile: int
+    time_steps: int
+    owned_nodes: np.ndarray
+    ghost_nodes: np.ndarray
+    identifiers: List[str]
+    positions: np.ndarray
+    neighbour_table: NeighbourTable
+    node_seeds: List[Optional[int]]
+    # Owned nodes that are a ghost in another tile and the tiles that hold them, their wave fronts are sent there
+    ghost_tiles: Dict[int, List[int]]
+    # Tiles that share a halo with this one, ascending
+    neighbour_tiles: List[int]
+    first_packet_id: int
+    packet_id_stride: int
+    queue_limit: int = None
+    queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP
+    # Arrivals of the owned nodes, set for a run
+    arrivals: ArrivalSource = None
+
+
+def transit_event(message: Message) -> tuple:
+    return packet_row(message) + (message.prop_packet_length,)
+
+
+def mirror_message(event: tuple) -> Message:
+    packet_id, origin_x, origin_y, max_range, code, parent, attempt, start_time, length = event
+    return Message(TYPE_BY_CODE[code], length, np.array((origin_x, origin_y)), packet_id, max_range, parent, attempt,
+                   start_time)
+
+
+def exchange_events(tile: int, peers: Dict[int, Connection],
+                    outboxes: Dict[int, List[TransitEvent]]) -> List[List[TransitEvent]]:
+    """
+    Send the events of this step to every neighbouring tile and receive theirs, in ascending tile order.
+    Every pair of tiles trades in the same global order, the lower tile sending first, so no two tiles ever wait
+    for each other even when an exchange does not fit in the pipe buffer.
+    """
+    inboxes = list()
+    for peer in sorted(peers):
+        if tile < peer:
+            peers[peer].send(outboxes[peer])
+            inboxes.append(peers[peer].recv())
+        else:
+            inboxes.append(peers[peer].recv())
+            peers[peer].send(outboxes[peer])
+        outboxes[peer].clear()
+    return inboxes
+
+
+def run_tile(connection: Connection, peers: Dict[int, Connection], task: TileTask):
+    """
+    Worker loop of one tile. Owned actors are stepped as in the object engine, ghosts only propagate the waves that
+    their owners put on the antenna and register them at the owned actors. A wave reaches a receiver at the earliest
+    one time step after it was put on the antenna, so exchanging wave front events with the neighbouring tiles once
+    per step keeps every tile exactly in line with a run of the whole network. The tile reads the arrivals of its
+    own nodes and only sends its history to 'connection' at the end.
+    """
+    tile_nodes = np.concatenate((task.owned_nodes, task.ghost_nodes))
+    local_index: Dict[int, int] = {node: index for index, node in enumerate(tile_nodes.tolist())}
+    num_owned = len(task.owned_nodes)
+
+    message_pool = MessagePool(task.first_packet_id, task.packet_id_stride)
+    states = list()
+    for identifier, position, node_seed in zip(task.identifiers, task.positions, task.node_seeds):
+        rng = NodeRandomStream(node_seed) if node_seed is not None else None
+        states.append(ActorState(identifier, 0.0, position, message_pool=message_pool, rng=rng,
+                                 queue_limit=task.queue_limit, queue_drop_policy=task.queue_drop_policy))
+    owned_states = states[:num_owned]
+    ghost_states = states[num_owned:]
+
+    # Owned actors see all their neighbours, ghosts only reach the owned actors of this tile
+    for index, state in enumerate(states):
+        neighbours = task.neighbour_table.neighbours(index).tolist()
+        distances = task.neighbour_table.neighbour_distances(index).tolist()
+        if index >= num_owned:
+            distances = [distance for neighbour, distance in zip(neighbours, distances) if neighbour < num_owned]
+            neighbours = [neighbour for neighbour in neighbours if neighbour < num_owned]
+        state.set_neighbour_states([states[neighbour] for neighbour in neighbours], distances)
+
+    outboxes: Dict[int, List[TransitEvent]] = {peer: list() for peer in peers}
+
+    def listener(node: int):
+        peer_outboxes = [outboxes[peer] for peer in task.ghost_tiles[node]]
+
+        def on_transit(message: Message, cut_off: bool):
+            event = (node, None if cut_off else transit_event(message))
+            for outbox in peer_outboxes:
+                outbox.append(event)
+        return on_transit
+
+    for node in task.ghost_tiles:
+        states[local_index[node]].transit_listener = listener(node)
+
+    recorder = HistoryRecorder(task.identifiers[:num_owned], [state.transmission_times for state in owned_states])
+    for time_index, new_messages in zip(range(task.time_steps), task.arrivals.iter_steps()):
+        for state in states:
+            state.prop_messages()
+        for state, new_message in zip(owned_states, new_messages.tolist()):
+            state.progress_actorstate_time(new_message)
+
+        for events in exchange_events(task.tile, peers, outboxes):
+            for node, event in events:
+                ghost = states[local_index[node]]
+                ghost.time_index = time_index
+                if event is None:
+                    ghost.cut_off_in_transit(ghost.in_transit_messages[-1])
+                else:
+                    ghost.put_in_transit(mirror_message(event))
+        for ghost in ghost_states:
+            ghost.arrival_index.advance(time_index)
+
+        recorder.record_states(owned_states, states)
+
+    connection.send(recorder.rows(0, task.time_steps))
+    connection.close()
+
+
+class TiledMacEngine(object):
+    """
+    Spatial domain decomposition of one network over worker processes.
+    Every tile is simulated by its own process, which reads the arrivals of its nodes and trades the wave front
+    events of its boundary nodes directly with the tiles that hold them as ghosts (the halo, nodes within
+    transmission range of the tile) once per time step. This process only collects the histories.
+    """
+
+    def __init__(self, identifiers: List[str], positions: np.ndarray, neighbour_table: NeighbourTable,
+                 num_tiles: int, node_seeds: np.ndarray = None, queue_limit: int = None,
+                 queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP):
+        assert num_tiles > 0
+        self.num_nodes = len(positions)
+        self.num_tiles = num_tiles
+        self.tiles = partition_tiles(positions, num_tiles)
+
+        receivers = neighbour_table.receivers
+        cross_links = self.tiles[receivers] != self.tiles[neighbour_table.indices]
+        # (tile, node) pairs of every ghost: a node of another tile that neighbours one of the tile's nodes
+        ghost_pairs = np.unique(np.stack((self.tiles[receivers[cross_links]],
+                                          neighbour_table.indices[cross_links]), axis=1), axis=0)
+        ghost_pairs = ghost_pairs.reshape(-1, 2)
+
+        self.owned_nodes = [np.flatnonzero(self.tiles == tile) for tile in range(num_tiles)]
+        self.ghost_nodes = [ghost_pairs[ghost_pairs[:, 0] == tile, 1] for tile in range(num_tiles)]
+        # Tiles that hold a node as ghost, to route its wave front events
+        self.ghost_tiles: Dict[int, List[int]] = dict()
+        for tile, node in ghost_pairs.tolist():
+            self.ghost_tiles.setdefault(node, list()).append(tile)
+        self.num_ghosts = len(ghost_pairs)
+        # Links are symmetric, so a tile holds ghosts of exactly the tiles that hold ghosts of it
+        self.neighbour_tiles = [np.unique(self.tiles[ghosts]).tolist() for ghosts in self.ghost_nodes]
+
+        self.tasks = list()
+        for tile in range(num_tiles):
+            tile_nodes = np.concatenate((self.owned_nodes[tile], self.ghost_nodes[tile]))
+            self.tasks.append(TileTask(
+                tile=tile,
+                time_steps=0,
+                owned_nodes=self.owned_nodes[tile],
+                ghost_nodes=self.ghost_nodes[tile],
+                identifiers=[identifiers[node] for node in tile_nodes.tolist()],
+                positions=positions[tile_nodes],
+                neighbour_table=neighbour_table.subgraph(tile_nodes),
+                node_seeds=[None] * len(tile_nodes) if node_seeds is None else node_seeds[tile_nodes].tolist(),
+                ghost_tiles={node: self.ghost_tiles[node] for node in self.owned_nodes[tile].tolist()
+                             if node in self.ghost_tiles},
+                neighbour_tiles=self.neighbour_tiles[tile],
+                first_packet_id=tile + 1,
+                packet_id_stride=num_tiles,
+                queue_limit=queue_limit,
+                queue_drop_policy=queue_drop_policy))
+
+    def run(self, arrival_schedule: ArrivalSource) -> HistoryStore:
+        """
+        Simulate all time steps in lock step over the tile processes and return the (time_steps, num_nodes) history.
+        Every tile reads its arrivals from its own copy of 'arrival_schedule', which is not iterated here.
+        """
+        # A pipe between every pair of neighbouring tiles
+        peers: List[Dict[int, Connection]] = [dict() for _ in range(self.num_tiles)]
+        for tile, neighbour_tiles in enumerate(self.neighbour_tiles):
+            for peer in neighbour_tiles:
+                if tile < peer:
+                    peers[tile][peer], peers[peer][tile] = Pipe()
+
+        connections: List[Connection] = list()
+        processes: List[Process] = list()
+        try:
+            for task, tile_peers in zip(self.tasks, peers):
+                task = attr.evolve(task, time_steps=arrival_schedule.time_steps,
+                                   arrivals=ArrivalSubset(copy.deepcopy(arrival_schedule), task.owned_nodes))
+                connection, worker_connection = Pipe()
+                process = Process(target=run_tile, args=(worker_connection, tile_peers, task))
+                process.start()
+                worker_connection.close()
+                connections.append(connection)
+                processes.append(process)
+            # Only the workers hold the ends of the peer pipes, so a worker that dies ends the wait of its peers
+            for tile_peers in peers:
+                for peer_connection in tile_peers.values():
+                    peer_connection.close()
+
+            tile_histories = [(nodes, connection.recv()) for connection, nodes in zip(connections, self.owned_nodes)]
+            sim_history = HistoryStore.merge_columns(self.num_nodes, tile_histories)
+        except BaseException:
+            # A worker died or this process was interrupted: the other workers would wait on their pipes forever
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for connection in connections:
+                connection.close()
+            for tile_peers in peers:
+                for peer_connection in tile_peers.values():
+                    peer_connection.close()
+            for process in processes:
+                process.join()
+        return sim_history
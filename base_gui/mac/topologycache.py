@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Tuple
+
+import attr
+import numpy as np
+
+from base_gui.mac.neighbourtable import NeighbourTable
+
+# (num_nodes, positional_spread, transmission_range, seed)
+TopologyKey = Tuple[int, float, float, int]
+
+
+@attr.attrs(auto_attribs=True, frozen=True)
+class Topology(object):
+    """
+    Node positions and the neighbour table (neighbours and distances) derived from them, everything of a network that
+    does not depend on traffic. Positions are read-only, so a topology can be shared by any number of oracle runs.
+    """
+    positions: np.ndarray
+    neighbour_table: NeighbourTable
+    transmission_range: float
+
+    @staticmethod
+    def generate(num_nodes: int, positional_spread: float, transmission_range: float, seed: int) -> 'Topology':
+        """
+        Same spherical normal distribution as Oracle.generate_actors, drawn from its own generator seeded with 'seed'.
+        """
+        cov = [[positional_spread, 0], [0, positional_spread]]
+        positions = np.random.RandomState(seed).multivariate_normal([0, 0], cov, num_nodes, check_valid='raise')
+        positions.setflags(write=False)
+        return Topology(positions, NeighbourTable.from_positions(positions, transmission_range), transmission_range)
+
+
+class TopologyCache(object):
+    """
+    Topologies keyed by node count, spread, range and seed, so reruns that only change traffic parameters skip
+    position generation and neighbour discovery. The least recently used topology is evicted beyond 'max_entries'.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        assert max_entries > 0
+        self.max_entries = max_entries
+        self.topologies: 'OrderedDict[TopologyKey, Topology]' = OrderedDict()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get(self, num_nodes: int, positional_spread: float, transmission_range: float, seed: int) -> Topology:
+        key = (num_nodes, positional_spread, transmission_range, seed)
+        topology = self.topologies.get(key)
+        if topology is not None:
+            self.num_hits += 1
+            self.topologies.move_to_end(key)
+            return topology
+
+        self.num_misses += 1
+        topology = Topology.generate(num_nodes, positional_spread, transmission_range, seed)
+        self.topologies[key] = topology
+        if len(self.topologies) > self.max_entries:
+            self.topologies.popitem(last=False)
+        return topology
+
+    def clear(self):
+        self.topologies.clear()
@@ -0,0 +1,472 @@
+import random
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from base_gui.mac.simconsts import SimConsts
+from base_gui.mac.actorstate import FrozenActorState
+from base_gui.mac.historystore import COUNTERS, CODE_BY_TYPE, OBSERVATION_DTYPE, PACKET_DTYPE, offsets_of, \
+    ranges_index
+from base_gui.mac.macprotocol import MacProtocol, CsmaCdProtocol, TYPE_DATA
+from base_gui.mac.macstate import MacState
+from base_gui.mac.message import ImmutableMessage
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.messagetype import MessageType
+from base_gui.mac.queuedroppolicy import QueueDropPolicy
+from base_gui.mac.neighbourtable import NeighbourTable
+from base_gui.mac.noderandomstream import NodeRandomStream
+
+# Message types are stored as small integer codes in the state arrays (TYPE_* of macprotocol)
+MESSAGE_TYPES = (MessageType.DATA, MessageType.JAMMING, MessageType.RETRANSMISSION)
+
+MAC_STATES = {state.value: state for state in MacState}
+# Message type codes of the history message table, by state array code
+HISTORY_TYPE_CODES = np.array([CODE_BY_TYPE[message_type] for message_type in MESSAGE_TYPES], dtype=np.int8)
+
+
+class VectorizedMacEngine(object):
+    """
+    Struct-of-arrays counterpart of a network of ActorState objects.
+    Node states, counters, timers, queues and in-flight wave fronts are NumPy arrays so one call to step() advances
+    the whole network. The MAC protocol is a pluggable batched kernel, CsmaCdProtocol mirrors
+    ActorState.progress_actorstate_time branch by branch.
+    """
+
+    def __init__(self, identifiers: List[str], positions: np.ndarray, neighbour_table: NeighbourTable,
+                 transmission_range=SimConsts.TRANSMISSION_RANGE,
+                 data_packet_length=SimConsts.PACKET_LENGTH_SPACE,
+                 jamming_packet_length=SimConsts.JAMMING_LENGTH_SPACE,
+                 time_step=SimConsts.TIME_STEP,
+                 max_attempts=SimConsts.MAX_ATTEMPTS,
+                 wave_velocity=SimConsts.WAVE_VELOCITY,
+                 queue_capacity=4,
+                 message_pool: MessagePool = None,
+                 rngs: List[NodeRandomStream] = None,
+                 protocol: MacProtocol = None,
+                 queue_limit: int = None,
+                 queue_drop_policy: QueueDropPolicy = QueueDropPolicy.TAIL_DROP):
+        self.identifiers = identifiers
+        self.positions = positions
+        self.num_nodes = len(positions)
+
+        self.max_transmission_range = transmission_range
+        self.data_packet_length = data_packet_length
+        self.jamming_packet_length = jamming_packet_length
+        self.time_step = time_step
+        self.max_attempts = max_attempts
+        self.wave_velocity = wave_velocity
+
+        self.time = 0.0
+        self.time_index = 0
+        # Only used for packet ids, 0 is reserved for 'no retransmission parent'
+        self.message_pool = message_pool if message_pool is not None else MessagePool()
+        # Per node backoff generator, the shared module-level generator if not given
+        self.rngs = rngs
+        self.protocol = protocol if protocol is not None else CsmaCdProtocol()
+        assert queue_limit is None or queue_limit > 0
+        self.queue_limit = queue_limit
+        self.queue_drop_policy = queue_drop_policy
+        self.next_wave_sequence = 0
+
+        n = self.num_nodes
+        self.state = np.full(n, MacState.IDLE.value, dtype=np.int8)
+        self.wait_time = np.zeros(n, dtype=np.int64)
+        self.drop_message = np.zeros(n, dtype=bool)
+        # Whether anything was sensed since the message on the antenna was put there (protocols without detection)
+        self.collision_seen = np.zeros(n, dtype=bool)
+        # Slot in the wave arrays of the message on the antenna (the last message put in transit)
+        self.current_slot = np.zeros(n, dtype=np.int64)
+
+        self.num_successful_transmissions = np.zeros(n, dtype=np.int64)
+        self.num_transmission_attempts = np.zeros(n, dtype=np.int64)
+        self.num_collisions = np.zeros(n, dtype=np.int64)
+        self.num_dropped_messages = np.zeros(n, dtype=np.int64)
+        self.num_queue_drops = np.zeros(n, dtype=np.int64)
+        self.num_messages = np.zeros(n, dtype=np.int64)
+        self.transmission_times: List[list] = [list() for _ in range(n)]
+
+        # Queued messages, one ring buffer per node (row)
+        self.queue_head = np.zeros(n, dtype=np.int64)
+        self.queue_count = np.zeros(n, dtype=np.int64)
+        self.queue_packet_id = np.zeros((n, queue_capacity), dtype=np.int64)
+        self.queue_parent = np.zeros((n, queue_capacity), dtype=np.int64)
+        self.queue_attempt = np.zeros((n, queue_capacity), dtype=np.int64)
+        self.queue_start_time = np.zeros((n, queue_capacity), dtype=np.float64)
+        self.queue_type = np.zeros((n, queue_capacity), dtype=np.int8)
+
+        # In-transit messages, a fixed set of wave slots per node (row). A node emits at most one message per step,
+        # so the slot count only has to cover the lifetime of a wave.
+        longest_packet = max(data_packet_length, jamming_packet_length)
+        wave_slots = int(np.ceil((transmission_range + longest_packet) / (time_step * wave_velocity))) + 2
+        self.wave_active = np.zeros((n, wave_slots), dtype=bool)
+        self.wave_distance = np.zeros((n, wave_slots), dtype=np.float64)
+        self.wave_length = np.zeros((n, wave_slots), dtype=np.float64)
+        self.wave_sequence = np.zeros((n, wave_slots), dtype=np.int64)
+        self.wave_packet_id = np.zeros((n, wave_slots), dtype=np.int64)
+        self.wave_parent = np.zeros((n, wave_slots), dtype=np.int64)
+        self.wave_attempt = np.zeros((n, wave_slots), dtype=np.int64)
+        self.wave_start_time = np.zeros((n, wave_slots), dtype=np.float64)
+        self.wave_type = np.zeros((n, wave_slots), dtype=np.int8)
+        self.wave_emission_index = np.zeros((n, wave_slots), dtype=np.int64)
+
+        # Busy timeline per receiver (see ArrivalIntervalIndex): a ring of difference counts over the upcoming time
+        # indices, long enough to hold the end of any arrival interval announced now
+        horizon = int(np.floor((transmission_range + longest_packet) / (time_step * wave_velocity))) + 2
+        self.busy_count = np.zeros(n, dtype=np.int64)
+        self.busy_deltas = np.zeros((n, horizon), dtype=np.int64)
+
+        # Directed links (transmitter -> receiver), sorted by receiver then transmitter like ActorState.neighbour_states
+        self.neighbour_table = neighbour_table
+        self.edge_rx = neighbour_table.receivers
+        self.edge_tx = neighbour_table.indices
+        self.edge_dist = neighbour_table.distances
+        # The same links ordered by transmitter, with the start of every transmitter's run
+        self.tx_edges = np.argsort(self.edge_tx, kind='stable')
+        self.tx_offsets = offsets_of(np.bincount(self.edge_tx, minlength=n))
+
+    def set_data_packet_length(self, data_packet_length: float):
+        """
+        Change the length of new data messages mid-run. The busy timelines grow if an arrival interval can now end
+        further ahead than they reach, pending boundaries keep their time index.
+        """
+        self.data_packet_length = data_packet_length
+        longest_packet = max(data_packet_length, self.jamming_packet_length)
+        delta_distance = self.time_step * self.wave_velocity
+        horizon = int(np.floor((self.max_transmission_range + longest_packet) / delta_distance)) + 2
+        old_horizon = self.busy_deltas.shape[1]
+        if horizon > old_horizon:
+            upcoming = self.time_index + np.arange(old_horizon)
+            busy_deltas = np.zeros((self.num_nodes, horizon), dtype=self.busy_deltas.dtype)
+            busy_deltas[:, upcoming % horizon] = self.busy_deltas[:, upcoming % old_horizon]
+            self.busy_deltas = busy_deltas
+
+    def new_packet_ids(self, count: int) -> np.ndarray:
+        return self.message_pool.new_packet_ids(count)
+
+    def __grow_queues(self):
+        capacity = self.queue_packet_id.shape[1]
+        order = (self.queue_head[:, np.newaxis] + np.arange(capacity)) % capacity
+        for name in ('queue_packet_id', 'queue_parent', 'queue_attempt', 'queue_start_time', 'queue_type'):
+            old = np.take_along_axis(getattr(self, name), order, axis=1)
+            new = np.zeros((self.num_nodes, capacity * 2), dtype=old.dtype)
+            new[:, :capacity] = old
+            setattr(self, name, new)
+        self.queue_head[:] = 0
+
+    def __write_queue(self, nodes, slots, packet_ids, parents, attempts, start_times, types):
+        self.queue_packet_id[nodes, slots] = packet_ids
+        self.queue_parent[nodes, slots] = parents
+        self.queue_attempt[nodes, slots] = attempts
+        self.queue_start_time[nodes, slots] = start_times
+        self.queue_type[nodes, slots] = types
+        self.queue_count[nodes] += 1
+
+    def push_back(self, nodes, packet_ids, parents, attempts, start_times, types):
+        if np.any(self.queue_count[nodes] >= self.queue_packet_id.shape[1]):
+            self.__grow_queues()
+        capacity = self.queue_packet_id.shape[1]
+        slots = (self.queue_head[nodes] + self.queue_count[nodes]) % capacity
+        self.__write_queue(nodes, slots, packet_ids, parents, attempts, start_times, types)
+
+    def push_front(self, nodes, packet_ids, parents, attempts, start_times, types):
+        if np.any(self.queue_count[nodes] >= self.queue_packet_id.shape[1]):
+            self.__grow_queues()
+        capacity = self.queue_packet_id.shape[1]
+        self.queue_head[nodes] = (self.queue_head[nodes] - 1) % capacity
+        self.__write_queue(nodes, self.queue_head[nodes], packet_ids, parents, attempts, start_times, types)
+
+    def pop_front(self, nodes):
+        slots = self.queue_head[nodes]
+        popped = (self.queue_packet_id[nodes, slots], self.queue_parent[nodes, slots],
+                  self.queue_attempt[nodes, slots], self.queue_start_time[nodes, slots], self.queue_type[nodes, slots])
+        self.queue_head[nodes] = (slots + 1) % self.queue_packet_id.shape[1]
+        self.queue_count[nodes] -= 1
+        return popped
+
+    def __grow_waves(self):
+        for name in ('wave_active', 'wave_distance', 'wave_length', 'wave_sequence', 'wave_packet_id',
+                     'wave_parent', 'wave_attempt', 'wave_start_time', 'wave_type', 'wave_emission_index'):
+            old = getattr(self, name)
+            new = np.zeros((self.num_nodes, old.shape[1] * 2), dtype=old.dtype)
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
+
+    def emit(self, nodes, packet_ids, parents, attempts, start_times, types, lengths):
+        """
+        Put messages on the antenna of the given nodes, returns the wave slot used per node.
+        """
+        if np.any(self.wave_active[nodes].all(axis=1)):
+            self.__grow_waves()
+        slots = np.argmin(self.wave_active[nodes], axis=1)
+        self.wave_active[nodes, slots] = True
+        self.wave_distance[nodes, slots] = 0.0
+        self.wave_length[nodes, slots] = lengths
+        self.wave_sequence[nodes, slots] = np.arange(self.next_wave_sequence, self.next_wave_sequence + len(nodes))
+        self.next_wave_sequence += len(nodes)
+        self.wave_packet_id[nodes, slots] = packet_ids
+        self.wave_parent[nodes, slots] = parents
+        self.wave_attempt[nodes, slots] = attempts
+        self.wave_start_time[nodes, slots] = start_times
+        self.wave_type[nodes, slots] = types
+        self.wave_emission_index[nodes, slots] = self.time_index
+
+        owners, receivers, distances = self.__links_of(nodes)
+        start, end = self.__arrival_intervals(self.time_index, distances, self.wave_length[nodes[owners], slots[owners]])
+        horizon = self.busy_deltas.shape[1]
+        np.add.at(self.busy_deltas, (receivers, start % horizon), 1)
+        np.add.at(self.busy_deltas, (receivers, end % horizon), -1)
+        return slots
+
+    def cut_off(self, nodes, slots):
+        """
+        Message.cut_off_message for the given waves, shortening their arrival intervals at every receiver.
+        """
+        owners, receivers, distances = self.__links_of(nodes)
+        emission_index = self.wave_emission_index[nodes[owners], slots[owners]]
+        start, old_end = self.__arrival_intervals(emission_index, distances, self.wave_length[nodes[owners], slots[owners]])
+        self.wave_length[nodes, slots] = self.wave_distance[nodes, slots]
+        _, new_end = self.__arrival_intervals(emission_index, distances, self.wave_length[nodes[owners], slots[owners]])
+        horizon = self.busy_deltas.shape[1]
+        np.add.at(self.busy_deltas, (receivers, old_end % horizon), 1)
+        np.add.at(self.busy_deltas, (receivers, np.maximum(new_end, start) % horizon), -1)
+
+    def __links_of(self, nodes):
+        """
+        Links leaving the given transmitters that their waves reach: index into 'nodes', receiver and distance.
+        Links are symmetric, so the receivers of a node are its own CSR row.
+        """
+        offsets = self.neighbour_table.offsets
+        starts = offsets[nodes]
+        counts = offsets[nodes + 1] - starts
+        owners = np.repeat(np.arange(len(nodes)), counts)
+        links = np.repeat(starts, counts) + np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        distances = self.neighbour_table.distances[links]
+        heard = distances < self.max_transmission_range
+        return owners[heard], self.neighbour_table.indices[links[heard]], distances[heard]
+
+    def __arrival_intervals(self, emission_index, txrx_dist, length):
+        """
+        Vectorized Message.arrival_interval for receivers within max range.
+        """
+        delta_distance = self.time_step * self.wave_velocity
+        start = emission_index + np.floor(txrx_dist / delta_distance).astype(np.int64) + 1
+        end = emission_index + np.floor((txrx_dist + length) / delta_distance).astype(np.int64) + 1
+        return start, end
+
+    def prop_messages(self):
+        """
+        Same arithmetic as Message.propagate, applied to every active wave at once.
+        """
+        active = self.wave_active
+        distance = np.where(active, self.wave_distance + self.time_step * self.wave_velocity, self.wave_distance)
+        overshot = distance - self.max_transmission_range
+        done = active & (overshot > 0)
+        purge = done & (overshot > self.wave_length)
+        clip = done & ~purge
+        self.wave_length = np.where(clip, self.wave_length - overshot, self.wave_length)
+        self.wave_distance = np.where(clip, self.max_transmission_range, distance)
+        self.wave_active = active & ~purge
+
+    def arriving_waves(self) -> np.ndarray:
+        """
+        Per directed link and wave slot of the transmitter: is the wave entering the receiver (Message.check_message_arriving).
+        """
+        distance = self.wave_distance[self.edge_tx]
+        length = self.wave_length[self.edge_tx]
+        txrx_dist = self.edge_dist[:, np.newaxis]
+        return self.wave_active[self.edge_tx] & ~(distance > txrx_dist + length) & (distance > txrx_dist)
+
+    def arriving_links(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The (link, wave slot) pairs that are set in arriving_waves, sorted by link and then in antenna order of the
+        transmitter. Only the links of active waves are tested.
+        """
+        wave_nodes, wave_slots = np.nonzero(self.wave_active)
+        counts = self.tx_offsets[wave_nodes + 1] - self.tx_offsets[wave_nodes]
+        edges = self.tx_edges[ranges_index(self.tx_offsets[wave_nodes], counts)]
+        wave_nodes, wave_slots = np.repeat(wave_nodes, counts), np.repeat(wave_slots, counts)
+        distance = self.wave_distance[wave_nodes, wave_slots]
+        txrx_dist = self.edge_dist[edges]
+        arriving = ~(distance > txrx_dist + self.wave_length[wave_nodes, wave_slots]) & (distance > txrx_dist)
+        edges, edge_slots = edges[arriving], wave_slots[arriving]
+        order = np.lexsort((self.wave_sequence[self.edge_tx[edges], edge_slots], edges))
+        return edges[order], edge_slots[order]
+
+    def any_neighbour_message_arriving(self) -> np.ndarray:
+        """
+        Carrier sense of every node at the current time index, a lookup into the busy timelines.
+        Folds the current time index into the running counts, so it is called once per step.
+        """
+        column = self.time_index % self.busy_deltas.shape[1]
+        self.busy_count += self.busy_deltas[:, column]
+        self.busy_deltas[:, column] = 0
+        return self.busy_count > 0
+
+    def random_exponential_backoff(self, node: int, attempt_count) -> int:
+        min_wait_time = 1
+
+        if attempt_count <= 6:
+            max_wait_time = pow(2, (2 + attempt_count)) - 1
+        else:
+            max_wait_time = 255
+
+        rng = random if self.rngs is None else self.rngs[node]
+        return rng.randint(min_wait_time, max_wait_time)
+
+    def random_uniform(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        One uniform [0, 1) draw per node, from the node generators if the engine has them.
+        """
+        if self.rngs is None:
+            return np.random.random(len(nodes))
+        return np.array([self.rngs[node].random() for node in nodes.tolist()])
+
+    def progress_time(self, new_messages: np.ndarray):
+        """
+        Batched ActorState.progress_actorstate_time for all nodes: queue new arrivals and run the protocol kernel.
+        CsmaCdProtocol draws backoffs in node order with the same randint calls as the object engine, so
+        seeded runs of both engines are interchangeable.
+        """
+        arrivals = np.flatnonzero(new_messages)
+        self.num_messages[arrivals] += 1
+        if self.queue_limit is not None and len(arrivals) > 0:
+            full = self.queue_count[arrivals] >= self.queue_limit
+            self.num_queue_drops[arrivals[full]] += 1
+            if self.queue_drop_policy is QueueDropPolicy.TAIL_DROP:
+                arrivals = arrivals[~full]
+            else:
+                self.pop_front(arrivals[full])
+        if len(arrivals) > 0:
+            count = len(arrivals)
+            self.push_back(arrivals, self.new_packet_ids(count), np.zeros(count, dtype=np.int64),
+                           np.ones(count, dtype=np.int64), np.full(count, self.time), np.full(count, TYPE_DATA))
+
+        busy = self.any_neighbour_message_arriving()
+        self.protocol.step(self, busy)
+
+        self.time += self.time_step
+        self.time_index += 1
+
+    def __immutable_message(self, node: int, packet_id, parent, attempt, start_time, message_type, distance, length):
+        return ImmutableMessage(
+            float(length),
+            self.positions[node],
+            int(packet_id),
+            self.max_transmission_range,
+            MESSAGE_TYPES[message_type],
+            float(distance),
+            int(parent),
+            int(attempt),
+            float(start_time)
+        )
+
+    def __frozen_waves(self, node: int) -> Dict[int, ImmutableMessage]:
+        """
+        Frozen in-transit messages of a node keyed by wave slot, in the order they were put on the antenna.
+        """
+        slots = np.flatnonzero(self.wave_active[node])
+        slots = slots[np.argsort(self.wave_sequence[node, slots])]
+        return {slot: self.__immutable_message(node, self.wave_packet_id[node, slot], self.wave_parent[node, slot],
+                                               self.wave_attempt[node, slot], self.wave_start_time[node, slot],
+                                               self.wave_type[node, slot], self.wave_distance[node, slot],
+                                               self.wave_length[node, slot])
+                for slot in slots}
+
+    def get_frozen_states(self) -> List[FrozenActorState]:
+        """
+        Snapshot every node as a FrozenActorState, identical in shape to ActorState.get_frozen_state.
+        """
+        in_transit = [self.__frozen_waves(node) for node in range(self.num_nodes)]
+
+        carriersense: List[list] = [list() for _ in range(self.num_nodes)]
+        arriving = self.arriving_waves()
+        for edge in np.flatnonzero(arriving.any(axis=1)):
+            tx_messages = in_transit[self.edge_tx[edge]]
+            carriersense[self.edge_rx[edge]].extend(
+                message for slot, message in tx_messages.items() if arriving[edge, slot])
+
+        capacity = self.queue_packet_id.shape[1]
+        frozen_states = list()
+        for node in range(self.num_nodes):
+            slots = (self.queue_head[node] + np.arange(self.queue_count[node])) % capacity
+            queued = [self.__immutable_message(node, self.queue_packet_id[node, slot], self.queue_parent[node, slot],
+                                               self.queue_attempt[node, slot], self.queue_start_time[node, slot],
+                                               self.queue_type[node, slot], 0.0, self.data_packet_length)
+                      for slot in slots]
+            frozen_states.append(FrozenActorState(
+                macState=MAC_STATES[self.state[node]],
+                identifier=self.identifiers[node],
+                queued_messages=tuple(queued),
+                in_transit_messages=tuple(in_transit[node].values()),
+                neighbour_messages_carriersense=tuple(carriersense[node]),
+                num_collisions=int(self.num_collisions[node]),
+                num_dropped_messages=int(self.num_dropped_messages[node]),
+                num_successful_transmissions=int(self.num_successful_transmissions[node]),
+                num_transmission_attempts=int(self.num_transmission_attempts[node]),
+                num_messages=int(self.num_messages[node]),
+                transmission_times=self.transmission_times[node],
+                num_queue_drops=int(self.num_queue_drops[node])
+            ))
+        return frozen_states
+
+    def __message_table(self, nodes: np.ndarray, packet_id, parent, attempt, start_time, message_type, distance,
+                        length) -> Tuple[np.ndarray, np.ndarray]:
+        # Observation and packet row of every message, see historystore
+        observations = np.zeros(len(nodes), dtype=OBSERVATION_DTYPE)
+        observations['packet_id'] = packet_id
+        observations['prop_distance'] = distance
+        observations['prop_packet_length'] = length
+        packets = np.zeros(len(nodes), dtype=PACKET_DTYPE)
+        packets['packet_id'] = packet_id
+        packets['origin_x'] = self.positions[nodes, 0]
+        packets['origin_y'] = self.positions[nodes, 1]
+        packets['max_range'] = self.max_transmission_range
+        packets['type'] = HISTORY_TYPE_CODES[message_type]
+        packets['retransmission_parent'] = parent
+        packets['attempt_count'] = attempt
+        packets['original_start_time'] = start_time
+        return observations, packets
+
+    def history_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Every node as a row of history cells for HistoryRecorder.record_columns: MAC states, counters, message list
+        lengths, and the observations and packets of the messages in the same order as get_frozen_states.
+        """
+        n = self.num_nodes
+        counters = np.stack([getattr(self, name) for name in COUNTERS], axis=1)
+        # In-transit messages: active wave slots in the order they were put on the antenna
+        wave_nodes, wave_slots = np.nonzero(self.wave_active)
+        if len(wave_nodes) == 0 and not self.queue_count.any():
+            # A quiet network, common at low load
+            return (self.state, counters, np.zeros((n, 3), dtype=np.int64), np.zeros(0, dtype=OBSERVATION_DTYPE),
+                    np.zeros(0, dtype=PACKET_DTYPE))
+        order = np.lexsort((self.wave_sequence[wave_nodes, wave_slots], wave_nodes))
+        wave_nodes, wave_slots = wave_nodes[order], wave_slots[order]
+        # Carrier sense: arriving waves of every receiver, by link and then in antenna order of the transmitter
+        edges, edge_slots = self.arriving_links()
+        # Queued messages: ring buffer slots from the head
+        queue_nodes = np.repeat(np.arange(n), self.queue_count)
+        queue_rank = np.arange(len(queue_nodes)) - np.repeat(np.cumsum(self.queue_count) - self.queue_count,
+                                                             self.queue_count)
+        queue_slots = (self.queue_head[queue_nodes] + queue_rank) % self.queue_packet_id.shape[1]
+
+        def waves(nodes: np.ndarray, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            return self.__message_table(nodes, self.wave_packet_id[nodes, slots], self.wave_parent[nodes, slots],
+                                        self.wave_attempt[nodes, slots], self.wave_start_time[nodes, slots],
+                                        self.wave_type[nodes, slots], self.wave_distance[nodes, slots],
+                                        self.wave_length[nodes, slots])
+
+        tables = (waves(self.edge_tx[edges], edge_slots),
+                  self.__message_table(queue_nodes, self.queue_packet_id[queue_nodes, queue_slots],
+                                       self.queue_parent[queue_nodes, queue_slots],
+                                       self.queue_attempt[queue_nodes, queue_slots],
+                                       self.queue_start_time[queue_nodes, queue_slots],
+                                       self.queue_type[queue_nodes, queue_slots], 0.0, self.data_packet_length),
+                  waves(wave_nodes, wave_slots))
+        # Lists follow each other per node, a stable sort on the owning node keeps the order within every list
+        order = np.argsort(np.concatenate((self.edge_rx[edges], queue_nodes, wave_nodes)), kind='stable')
+        observations = np.concatenate([observations for observations, _ in tables])[order]
+        packets = np.concatenate([packets for _, packets in tables])[order]
+        message_counts = np.stack((np.bincount(self.edge_rx[edges], minlength=n), self.queue_count,
+                                   np.bincount(wave_nodes, minlength=n)), axis=1)
+        return self.state, counters, message_counts, observations, packets
@@ -13,9 +13,11 @@ from base_gui.simulation.gui_sim_mac import GuiSimMac
 
 def run_mac_simulation(guiSim: GuiSimMac, num_nodes):
     print("Generating guiSimMac with constants")
-    guiSim.generate_oracle(num_nodes, SimConsts.DISTANCE_SPREAD_SIGMA_MAC)
-    print("Scaling pixels/meter to fit nodes in simulation")
-    scale_simulation_fit_nodes(guiSim, guiSim.sim_rect.inflate(-100, -200))
+    if guiSim.generate_oracle(num_nodes, SimConsts.DISTANCE_SPREAD_SIGMA_MAC):
+        print("Scaling pixels/meter to fit nodes in simulation")
+        scale_simulation_fit_nodes(guiSim, guiSim.sim_rect.inflate(-100, -200))
+    else:
+        print("Re-using cached topology of {} nodes".format(num_nodes))
     print("Processing guiSimMac")
     guiSim.run_oracle_preprocess(SimConsts.TIME_MAX_STEPS, SimConsts.TIME_STEP)
     return guiSim
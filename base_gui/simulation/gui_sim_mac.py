@@ -1,5 +1,6 @@
 from typing import List
 
+import numpy as np
 import pygame
 from pygame import Vector2
 
@@ -8,8 +9,10 @@ from base_gui.constants import MENU_CHECKBOXES_GENERIC, MENU_CHECKBOX_NODELABELS
 from base_gui.gui_components.game import Game
 from base_gui.mac.actorstate import FrozenActorState
 from base_gui.mac.oracle import Oracle
+from base_gui.mac.topologycache import TopologyCache, Topology
 from base_gui.simulation.node import Node
 from base_gui.simulation.nodelegend import NodeLegend
+from base_gui.simulation.palette import STATE_DESCRIPTION_DICT
 
 
 class GuiSimMac(Game):
@@ -21,13 +24,27 @@ class GuiSimMac(Game):
         self.sim_rect: pygame.Rect = sim_rect
         self.local_origin = local_origin
         self.oracle: Oracle
+        # Topologies of earlier runs, so a rerun with only other traffic parameters skips neighbour discovery
+        self.topology_cache = TopologyCache()
+        self.topology_seed = int(np.random.randint(2 ** 31))
+        self.topology: Topology = None
 
         self.show_oracle_states_timeindex = 0
 
-    def generate_oracle(self, num_nodes, positional_spread):
+    def generate_oracle(self, num_nodes, positional_spread) -> bool:
+        """
+        Create a new oracle on the cached topology of these parameters (generated on first use).
+        Returns whether the topology differs from the previous run, the data nodes are only rebuilt if it does.
+        """
+        topology = self.topology_cache.get(num_nodes, positional_spread, SimConsts.TRANSMISSION_RANGE,
+                                           self.topology_seed)
         self.oracle = Oracle(num_nodes=num_nodes, positional_spread=positional_spread)
-        self.oracle.generate_actors()
+        self.oracle.load_topology(topology)
+        if topology is self.topology:
+            return False
+        self.topology = topology
         self.generate_nodes()
+        return True
 
     def run_oracle_preprocess(self, time_steps, time_delta):
         assert self.oracle is not None
@@ -57,7 +74,7 @@ class GuiSimMac(Game):
     def generate_legend(self, start_location: Vector2, vert_offset):
         self.legend_nodes = list()
         count = 0
-        for key, value in SimConsts.STATE_DESCRIPTION_DICT.items():
+        for key, value in STATE_DESCRIPTION_DICT.items():
             new_position = Vector2(start_location.x, start_location.y + vert_offset * count)
             new_legend_entry = NodeLegend(screen=self.screen, global_position=new_position, label=value,
                                           labeled_state=key)
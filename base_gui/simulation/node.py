@@ -4,8 +4,8 @@ import pygame
 from pygame import Vector2, Surface, gfxdraw
 from pygame.rect import Rect
 
-from base_gui.constants import SimConsts
 from base_gui.mac.actorstate import MacState
+from base_gui.simulation.palette import STATE_COLOR_DICT, MESSAGE_COLOR_DICT, WAVES_DENSITY
 from base_gui.simulation.wave import Wave
 from base_gui.utils.reference_frame import vector2_global_to_local, scale_tuple_pix2meter
 
@@ -45,7 +45,7 @@ class Node(object):
             True)
 
     def set_color_by_state(self, state: MacState):
-        self.color = SimConsts.STATE_COLOR_DICT[state]
+        self.color = STATE_COLOR_DICT[state]
 
     def set_wavefronts(self, wave_specs: List[Vector2], message_types):
         """
@@ -66,11 +66,11 @@ class Node(object):
                 self.add_wavefront(0, minmax_donut[1], message_types[index])
 
     def add_wavefront(self, min_radius, max_radius, message_type):
-        color = SimConsts.MESSAGE_COLOR_DICT[message_type]
+        color = MESSAGE_COLOR_DICT[message_type]
 
         self.waves.append(
             Wave(self.screen,
-                 min_radius, max_radius, SimConsts.WAVES_DENSITY, color,
+                 min_radius, max_radius, WAVES_DENSITY, color,
                  global_position=self.global_position)
         )
 
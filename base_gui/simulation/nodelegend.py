@@ -1,8 +1,8 @@
 import pygame
 from pygame import Vector2, Surface, gfxdraw
 
-from base_gui.constants import SimConsts
 from base_gui.mac.actorstate import MacState
+from base_gui.simulation.palette import STATE_COLOR_DICT
 
 
 class NodeLegend(object):
@@ -24,7 +24,7 @@ class NodeLegend(object):
         self.global_position = global_position
 
     def set_color_by_state(self, state: MacState):
-        self.color = SimConsts.STATE_COLOR_DICT[state]
+        self.color = STATE_COLOR_DICT[state]
 
     def render(self):
         self.font_surface = self.font.render(self.label, True, pygame.Color("black"))
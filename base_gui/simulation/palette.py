@@ -0,0 +1,34 @@
+from typing import Dict, Any
+
+import pygame
+
+from base_gui.mac.macstate import MacState
+from base_gui.mac.messagetype import MessageType
+
+STATE_COLOR_DICT: Dict[MacState, pygame.Color] = {
+    MacState.IDLE: pygame.Color("gray"),
+    MacState.READY_TO_TRANSMIT: pygame.Color("blue"),
+    MacState.WAIT: pygame.Color("green"),
+    MacState.TRANSMITTING: pygame.Color("purple"),
+    MacState.JAMMING: pygame.Color("red")
+}
+
+# Used for legend
+STATE_DESCRIPTION_DICT: Dict[MacState, Any] = {
+    MacState.IDLE: "Idle node",
+    MacState.READY_TO_TRANSMIT: "Node ready to transmit",
+    MacState.WAIT: "Node waiting",
+    MacState.TRANSMITTING: "Node transmitting",
+    MacState.JAMMING: "Node jamming"
+}
+
+MESSAGE_COLOR_DICT: Dict[MessageType, pygame.Color] = {
+    MessageType.DATA: pygame.Color("black"),
+    MessageType.CTS: pygame.Color("black"),
+    MessageType.RTS: pygame.Color("black"),
+    MessageType.ACK: pygame.Color("black"),
+    MessageType.JAMMING: pygame.Color("red3"),
+    MessageType.RETRANSMISSION: pygame.Color("blue")
+}
+
+WAVES_DENSITY = 2
@@ -0,0 +1,60 @@
+"""
+Memory and time budget of a single ActorState.
+Builds a random topology of ActorStates (without the GUI history) and reports the traced bytes per actor and the
+wall time per actor-step of the fixed-step loop.
+
+Usage: python tools/actorstate_budget.py [num_nodes] [time_steps] [transmission_chance]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from base_gui.mac.actorstate import ActorState
+from base_gui.mac.messagepool import MessagePool
+from base_gui.mac.neighbourtable import NeighbourTable
+from base_gui.mac.simconsts import SimConsts
+
+
+def build_actors(num_nodes: int, message_pool: MessagePool):
+    spread = np.sqrt(num_nodes) * SimConsts.TRANSMISSION_RANGE
+    positions = np.random.uniform(0.0, spread, (num_nodes, 2))
+    actors = [ActorState(str(index), 0.0, positions[index], message_pool=message_pool) for index in range(num_nodes)]
+    table = NeighbourTable.from_positions(positions, SimConsts.TRANSMISSION_RANGE)
+    for index, actor in enumerate(actors):
+        actor.set_neighbour_states([actors[neighbour] for neighbour in table.neighbours(index).tolist()],
+                                   table.neighbour_distances(index).tolist())
+    return actors
+
+
+def main():
+    num_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    time_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    transmission_chance = float(sys.argv[3]) if len(sys.argv) > 3 else 0.001
+    random.seed(0)
+    np.random.seed(0)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    actors = build_actors(num_nodes, MessagePool())
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(time_steps):
+        for actor in actors:
+            actor.prop_messages()
+        new_messages = np.random.random(num_nodes) < transmission_chance
+        for actor, new_message in zip(actors, new_messages.tolist()):
+            actor.progress_actorstate_time(new_message)
+    elapsed = time.perf_counter() - start
+
+    print("Nodes: {}, time steps: {}, transmission chance: {}".format(num_nodes, time_steps, transmission_chance))
+    print("Memory per actor: {:.0f} bytes".format((after - before) / num_nodes))
+    print("Time per actor-step: {:.2f} us".format(elapsed / (num_nodes * time_steps) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Wall time of the tiled oracle mode against the serial object engine on the same network and arrivals.
+The network is spread so that every node has about 'mean_degree' neighbours; both runs use the same seed and must
+end with the same counters. A speed-up needs at least as many free cores as tiles.
+
+Usage: python tools/tiled_benchmark.py [num_nodes] [time_steps] [transmission_chance] [tiles] [mean_degree]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from base_gui.mac.oracle import Oracle
+from base_gui.mac.simconsts import SimConsts
+
+
+def run(num_nodes: int, spread: float, time_steps: int, transmission_chance: float, tiles: int = None):
+    np.random.seed(0)
+    oracle = Oracle(num_nodes, spread)
+    oracle.report_progress = False
+    oracle.generate_actors()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        oracle.preprocess(time_steps, 1, transmission_chance, SimConsts.TRANSMISSION_RANGE,
+                          SimConsts.PACKET_LENGTH_SPACE, seed=0, tiles=tiles)
+    return time.perf_counter() - start, oracle
+
+
+def main():
+    num_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    time_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    transmission_chance = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+    tiles = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    mean_degree = float(sys.argv[5]) if len(sys.argv) > 5 else 8.0
+    # Positions are normal with variance 'spread' per axis, the density near the centre sets the degree
+    spread = num_nodes * SimConsts.TRANSMISSION_RANGE ** 2 / (4.0 * mean_degree)
+
+    serial_time, serial = run(num_nodes, spread, time_steps, transmission_chance)
+    tiled_time, tiled = run(num_nodes, spread, time_steps, transmission_chance, tiles)
+    names = ('num_successful_transmissions', 'num_collisions', 'num_messages')
+    totals = [tuple(int(oracle.sim_history.counter(name, -1).sum()) for name in names) for oracle in (serial, tiled)]
+
+    print("Nodes: {}, time steps: {}, transmission chance: {}, tiles: {}, cores: {}".format(
+        num_nodes, time_steps, transmission_chance, tiles, len(os.sched_getaffinity(0))
+        if hasattr(os, 'sched_getaffinity') else os.cpu_count()))
+    print("Mean degree: {:.1f}".format(len(serial.neighbour_table.indices) / num_nodes))
+    print("Serial object engine: {:.2f} s".format(serial_time))
+    print("Tiled: {:.2f} s, speed-up {:.2f}x".format(tiled_time, serial_time / tiled_time))
+    print("Same totals: {} {}".format(totals[0] == totals[1], totals[0]))
+
+
+if __name__ == '__main__':
+    main()